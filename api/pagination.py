@@ -0,0 +1,17 @@
+from django.conf import settings
+
+
+class SettingsPageSizeMixin:
+    """
+    Read page_size and max_page_size from the settings named by
+    `page_size_setting` and `max_page_size_setting` on every request, so
+    they can be changed without touching the pagination class.
+    """
+    page_size_setting = None
+    max_page_size_setting = None
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        self.page_size = getattr(settings, self.page_size_setting, 20)
+        self.max_page_size = getattr(settings, self.max_page_size_setting, 100)
+        return super().get_page_size(request)
@@ -0,0 +1,61 @@
+import math
+
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def check_finite(data):
+    """
+    Raise ValueError for NaN or infinite floats in `data`, which orjson would
+    silently write as null.
+    """
+    containers = [data]
+    while containers:
+        container = containers.pop()
+        for value in container.values() if isinstance(container, dict) else container:
+            if isinstance(value, float):
+                if not math.isfinite(value):
+                    raise ValueError('Out of range float values are not JSON compliant')
+            elif isinstance(value, (dict, list, tuple)):
+                containers.append(value)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Renders JSON with orjson, which encodes dicts, lists, strings, numbers
+    and UUIDs natively. Anything else goes through DRF's encoder, and so do
+    datetimes, so the output matches JSONRenderer byte for byte in meaning.
+    Like JSONRenderer, it refuses NaN and infinity unless STRICT_JSON is off.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    strict = api_settings.STRICT_JSON
+    encoder = JSONEncoder()
+
+    def default(self, obj):
+        value = self.encoder.default(obj)
+        if self.strict:
+            check_finite([value])
+        return value
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        options = self.options
+        # The browsable API asks for indented JSON.
+        if (renderer_context or {}).get('indent') or 'indent=' in (accepted_media_type or ''):
+            options |= orjson.OPT_INDENT_2
+        try:
+            content = orjson.dumps(data, default=self.default, option=options)
+        except orjson.JSONEncodeError:
+            # orjson hides the error default() raised, let JSONRenderer raise it.
+            return JSONRenderer().render(data, accepted_media_type, renderer_context)
+        # NaN and infinity come out as null, so only look for them if it shows up.
+        if self.strict and b'null' in content:
+            check_finite([data])
+        return content
@@ -0,0 +1,52 @@
+from rest_framework import serializers
+
+
+class ValuesSerializer:
+    """
+    Read only stand-in for `serializer_class` on list endpoints.
+
+    Rows are fetched with values() and the output dicts are built directly,
+    calling a field's to_representation only where the database value is
+    not already its representation. Related fields are filled in by
+    add_related() with one query per page. The output is the same as
+    `serializer_class(rows, many=True).data` would be for model instances.
+    """
+    serializer_class = None
+    # Fields whose to_representation returns these database values unchanged.
+    plain_fields = (serializers.CharField, serializers.IntegerField, serializers.BooleanField)
+    related_fields = (serializers.RelatedField, serializers.ManyRelatedField, serializers.BaseSerializer)
+
+    def __init__(self, context=None):
+        self.fields = self.serializer_class(context=context).fields
+        self.columns = [
+            (name, field.source, None if isinstance(field, self.plain_fields + self.related_fields)
+             else field.to_representation)
+            for name, field in self.fields.items()
+        ]
+
+    def get_queryset(self, queryset, keys=()):
+        """
+        Select the columns of the fields, the primary key and `keys`, which
+        the pagination orders by.
+        """
+        columns = [queryset.model._meta.pk.name] + [
+            field.source for field in self.fields.values() if not isinstance(field, self.related_fields)]
+        return queryset.prefetch_related(None).values(*dict.fromkeys(columns + list(keys)))
+
+    def add_related(self, rows):
+        """
+        Store the representation of the related fields in each row.
+        """
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        self.add_related(rows)
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, to_representation in self.columns:
+                value = row[source]
+                item[name] = value if value is None or to_representation is None else to_representation(value)
+            data.append(item)
+        return data
@@ -1,3 +1,64 @@
+import datetime
+import io
+import json
+import uuid
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTests(TestCase):
+    def test_output_matches_the_default_renderer(self):
+        data = {
+            'id': uuid.uuid4(),
+            'created_at': timezone.now(),
+            'date': datetime.date(2020, 11, 8),
+            'price': Decimal('1.50'),
+            'label': gettext_lazy('Name'),
+            'choices': [{'votes': 3, 'text': 'Ñandú'}, None, True],
+            1: 'integer key',
+        }
+
+        self.assertEqual(
+            json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+    def test_indents_for_the_browsable_api(self):
+        rendered = ORJSONRenderer().render({'a': 1}, 'application/json', {'indent': 4})
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+    def test_refuses_nan_and_infinity_like_the_default_renderer(self):
+        for value in (float('nan'), float('inf'), -float('inf'), Decimal('NaN')):
+            data = {'summary': {'mean': 1.5, 'percentiles': [value]}}
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render(data)
+                with self.assertRaises(ValueError):
+                    ORJSONRenderer().render(data)
+
+    def test_renders_nothing_for_none(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_api_responds_with_orjson(self):
+        response = self.client.get('/api/v1/polls/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['results'], [])
+
+
+class ORJSONParserTests(TestCase):
+    def test_parses_like_the_default_parser(self):
+        body = '{"emails": ["luke@email.com"], "count": 1.5, "nested": {"ok": true}}'.encode()
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
 
-# Create your tests here.
+    def test_invalid_json_is_a_parse_error(self):
+        for body in (b'{"emails": ', b'{"count": NaN}'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(body))
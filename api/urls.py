@@ -1,5 +1,8 @@
+from classroom.views import (EnrollmentImportAPIView, GradebookAPIView,
+                             PortfolioGradebookAPIView)
 from django.urls import path
-from polls.views import QuestionDetailAPIView, QuestionListAPIView
+from polls.views import (QuestionDetailAPIView, QuestionListAPIView,
+                         QuestionResultsAPIView, QuestionSearchAPIView)
 from users.views import (ProfileDetailAPIView, ProfileListAPIView,
                          UserDetailAPIView, UserListAPIView)
 
@@ -8,6 +11,11 @@ urlpatterns = [
     path('users/', UserListAPIView.as_view()),
     path('profile/', ProfileListAPIView.as_view()),
     path('profile/<uuid:pk>/', ProfileDetailAPIView.as_view()),
+    path('classroom/gradebook/', PortfolioGradebookAPIView.as_view()),
+    path('classroom/<uuid:pk>/enrollments/', EnrollmentImportAPIView.as_view()),
+    path('classroom/<uuid:pk>/gradebook/', GradebookAPIView.as_view()),
     path('polls/', QuestionListAPIView.as_view()),
+    path('polls/search/', QuestionSearchAPIView.as_view()),
     path('polls/<uuid:pk>/', QuestionDetailAPIView.as_view()),
+    path('polls/<uuid:pk>/results/', QuestionResultsAPIView.as_view()),
 ]
@@ -1,3 +1,25 @@
-from django.shortcuts import render
+from rest_framework.response import Response
 
-# Create your views here.
+
+class ValuesListMixin:
+    """
+    Serve list requests through `values_serializer_class`, a
+    api.serializers.ValuesSerializer, instead of the view's serializer_class.
+    Everything else the view does still goes through its serializer.
+    """
+    values_serializer_class = None
+
+    def get_ordering_keys(self):
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        return [field.lstrip('-') for field in ordering]
+
+    def list(self, request, *args, **kwargs):
+        values = self.values_serializer_class(context=self.get_serializer_context())
+        queryset = values.get_queryset(self.filter_queryset(self.get_queryset()), self.get_ordering_keys())
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values.to_representation(page))
+        return Response(values.to_representation(queryset))
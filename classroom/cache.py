@@ -0,0 +1,65 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+def get_or_compute(key, compute, timeout=None):
+    """
+    Return the cached value of `key`, computing it with `compute()` when it is
+    missing or older than `timeout` seconds.
+
+    Only the request holding the recompute lock runs `compute()`. While it
+    does, everyone else keeps getting the stale value, or waits a little for
+    the fresh one when there is nothing cached yet.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'CLASSROOM_LEADERBOARD_CACHE_TIMEOUT', 60)
+    lock_timeout = getattr(settings, 'CLASSROOM_LEADERBOARD_LOCK_TIMEOUT', 10)
+
+    cached = cache.get(key)
+    if cached is not None:
+        value, fresh_until = cached
+        if time.time() < fresh_until or not cache.add(lock_key(key), 1, lock_timeout):
+            return value
+        return recompute(key, compute, timeout)
+
+    if cache.add(lock_key(key), 1, lock_timeout):
+        return recompute(key, compute, timeout)
+
+    # Someone else is computing the first value, give them a moment.
+    deadline = time.time() + lock_timeout
+    while time.time() < deadline:
+        time.sleep(0.05)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached[0]
+
+    logger.warning('Gave up waiting for %s to be computed', key)
+    return compute()
+
+
+def recompute(key, compute, timeout):
+    try:
+        value = compute()
+        # Keep serving the stale value for as long again while it is rebuilt.
+        cache.set(key, (value, time.time() + timeout), timeout * 2)
+        return value
+    finally:
+        cache.delete(lock_key(key))
+
+
+def lock_key(key):
+    return '{}:lock'.format(key)
+
+
+def gradebook_cache_key(classroom_id):
+    # v2 gradebooks carry the totals get_portfolio() pools.
+    return 'classroom:gradebook:v2:{}'.format(classroom_id)
+
+
+def invalidate_gradebooks(*classroom_ids):
+    cache.delete_many([gradebook_cache_key(classroom_id) for classroom_id in classroom_ids])
@@ -1,9 +1,12 @@
+import csv
+import io
+import itertools
 import logging
 
 from django import forms
-from django.core.mail import send_mail
 
-from classroom.models import Post
+from classroom.models import ENROLLMENT_MESSAGE, Post
+from pages.models import OutboundEmail
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +16,30 @@ class EnrollmentForm(forms.Form):
 
     def send_mail(self, **kwargs):
         user_email = kwargs['student'].email
-        logger.info('sending enrollment email to %s ...', user_email)
-        message = 'Congratulations you have enrolled to class {} successfully!'.format(kwargs['classroom'].name)
-        send_mail(subject='Site message', message=message, from_email='site@website.domain',
-                  recipient_list=['gurupratap.matharu@gmail.com', user_email], fail_silently=False)
+        logger.info('queueing enrollment email to %s ...', user_email)
+        message = ENROLLMENT_MESSAGE.format(kwargs['classroom'].name)
+        OutboundEmail.objects.enqueue(subject='Site message', message=message, from_email='site@website.domain',
+                                      recipient_list=['gurupratap.matharu@gmail.com', user_email])
+
+
+class EnrollmentImportForm(forms.Form):
+    file = forms.FileField(label='CSV file', help_text='One email per row, or a column named email.')
+
+    def clean_file(self):
+        try:
+            return self.cleaned_data['file'].read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise forms.ValidationError('The file must be UTF-8 encoded CSV.')
+
+    def get_emails(self):
+        rows = csv.reader(io.StringIO(self.cleaned_data['file']))
+        header = next(rows, [])
+        columns = [column.strip().lower() for column in header]
+        if 'email' in columns:
+            index = columns.index('email')
+        else:
+            index, rows = 0, itertools.chain([header], rows)
+        return [row[index] for row in rows if len(row) > index]
 
 
 class PostForm(forms.ModelForm):
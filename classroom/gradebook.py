@@ -0,0 +1,141 @@
+import bisect
+import math
+import statistics
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+
+from classroom.cache import gradebook_cache_key
+from classroom.models import Enrollment
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def quantile(marks, fraction):
+    """
+    The `fraction` quantile of sorted `marks`, interpolating between the two
+    closest ranks.
+    """
+    position = (len(marks) - 1) * fraction
+    lower = math.floor(position)
+    upper = min(lower + 1, len(marks) - 1)
+    return marks[lower] + (marks[upper] - marks[lower]) * (position - lower)
+
+
+def histogram(marks, buckets):
+    """
+    Split the range of sorted `marks` into `buckets` equal intervals and count
+    the marks in each one with a binary search per edge.
+    """
+    low, high = marks[0], marks[-1]
+    if low == high:
+        return [{'low': low, 'high': high, 'count': len(marks)}]
+
+    width = (high - low) / buckets
+    edges = [low + width * n for n in range(buckets)] + [high]
+    positions = [bisect.bisect_left(marks, edge) for edge in edges[:-1]] + [len(marks)]
+    return [
+        {'low': round(edges[n], 2), 'high': round(edges[n + 1], 2), 'count': positions[n + 1] - positions[n]}
+        for n in range(buckets)
+    ]
+
+
+def summarize(marks, mean, stddev):
+    """
+    Statistics of a sorted, non empty sequence of marks.
+    """
+    return {
+        'count': len(marks),
+        'mean': round(mean, 2),
+        'median': quantile(marks, 0.5),
+        'stddev': round(stddev, 2),
+        'min': marks[0],
+        'max': marks[-1],
+        'percentiles': {str(n): round(quantile(marks, n / 100), 2) for n in PERCENTILES},
+    }
+
+
+def load_gradebook(classroom_id):
+    """
+    Build the gradebook of a classroom from one query over its enrollments.
+    """
+    rows = Enrollment.objects.filter(classroom_id=classroom_id).order_by('marks', 'student__username').values_list(
+        'student_id', 'student__username', 'marks')
+    students, usernames, marks = [], [], array('l')
+    for student_id, username, mark in rows.iterator():
+        students.append(student_id)
+        usernames.append(username)
+        marks.append(mark)
+
+    if not marks:
+        return {'summary': None, 'histogram': [], 'students': [], 'totals': None}
+
+    mean = statistics.fmean(marks)
+    stddev = statistics.pstdev(marks, mean)
+    return {
+        'summary': summarize(marks, mean, stddev),
+        # Exact, unlike the rounded summary, for pooling classrooms together.
+        'totals': {'count': len(marks), 'sum': sum(marks), 'sum_of_squares': sum(mark * mark for mark in marks)},
+        'histogram': histogram(marks, getattr(settings, 'CLASSROOM_GRADEBOOK_BUCKETS', 10)),
+        'students': [
+            {'id': pk, 'username': username, 'marks': mark,
+             'z_score': round((mark - mean) / stddev, 3) if stddev else 0.0}
+            for pk, username, mark in zip(students, usernames, marks)
+        ],
+    }
+
+
+def get_gradebooks(classroom_ids):
+    """
+    Return {classroom id: gradebook}, from the cache where possible. Cached
+    gradebooks are dropped whenever an enrollment of the classroom changes.
+    """
+    keys = {gradebook_cache_key(classroom_id): classroom_id for classroom_id in classroom_ids}
+    cached = cache.get_many(keys)
+    gradebooks = {keys[key]: gradebook for key, gradebook in cached.items()}
+
+    missing = {key: load_gradebook(classroom_id) for key, classroom_id in keys.items() if key not in cached}
+    if missing:
+        cache.set_many(missing, getattr(settings, 'CLASSROOM_GRADEBOOK_CACHE_TIMEOUT', 86400))
+        gradebooks.update({keys[key]: gradebook for key, gradebook in missing.items()})
+    return gradebooks
+
+
+def get_gradebook(classroom_id):
+    gradebook = get_gradebooks([classroom_id])[classroom_id]
+    return {key: value for key, value in gradebook.items() if key != 'totals'}
+
+
+def get_portfolio(classrooms):
+    """
+    Summaries of several classrooms and of all their marks together. The
+    combined mean and standard deviation are pooled from the exact count,
+    sum and sum of squares of every classroom, so no marks are read twice.
+    """
+    gradebooks = get_gradebooks([classroom.pk for classroom in classrooms])
+    summaries = [(classroom, gradebooks[classroom.pk]['summary']) for classroom in classrooms]
+
+    totals = [gradebook['totals'] for gradebook in gradebooks.values() if gradebook['totals'] is not None]
+    overall = None
+    if totals:
+        count = sum(total['count'] for total in totals)
+        marks = sum(total['sum'] for total in totals)
+        squares = sum(total['sum_of_squares'] for total in totals)
+        # Marks are integers, so the variance is exact up to the division.
+        variance = (count * squares - marks * marks) / (count * count)
+        filled = [summary for _, summary in summaries if summary is not None]
+        overall = {
+            'count': count,
+            'mean': round(marks / count, 2),
+            'stddev': round(math.sqrt(variance), 2),
+            'min': min(summary['min'] for summary in filled),
+            'max': max(summary['max'] for summary in filled),
+        }
+
+    return {
+        'overall': overall,
+        'classrooms': [
+            {'id': str(classroom.pk), 'name': classroom.name, 'summary': summary} for classroom, summary in summaries
+        ],
+    }
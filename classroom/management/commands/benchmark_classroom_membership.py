@@ -0,0 +1,80 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+
+from classroom.models import Classroom, Enrollment
+from polls.management.benchmark import BenchmarkCommand, delete_rows
+
+NAME = 'benchmark-membership'
+
+
+class Command(BenchmarkCommand):
+    help = 'Compare the classroom list membership filters for a student enrolled in --enrollments of --classrooms'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classrooms', type=int, default=1000000)
+        parser.add_argument('--enrollments', type=int, default=500)
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=100000)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded classrooms')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        teacher, _ = User.objects.get_or_create(username='benchmark', defaults={'email': 'benchmark@example.com'})
+        student, _ = User.objects.get_or_create(
+            username='benchmark-student', defaults={'email': 'benchmark-student@example.com'})
+
+        try:
+            self.seed(teacher, student, options['classrooms'], options['enrollments'], options['batch_size'])
+
+            previous = Classroom.objects.filter(Q(students=student) | Q(created_by=student)).distinct()
+            current = Classroom.objects.filter(pk__in=Classroom.objects.member_ids(student))
+            for label, queryset in (('OR + DISTINCT', previous), ('UNION', current)):
+                self.report(label, [self.time_page(queryset) for _ in range(options['runs'])], 'pages')
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+    def seed(self, teacher, student, classrooms, enrollments, batch_size):
+        started = time.perf_counter()
+        for offset in range(0, classrooms, batch_size):
+            size = min(batch_size, classrooms - offset)
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'INSERT INTO {} (id, name, section, subject, room, is_active, student_count, posts_count, '
+                        'created_at, updated_at, created_by_id) '
+                        "SELECT gen_random_uuid(), %s, '', '', '', true, 0, 0, now() - n * interval '1 second', "
+                        "now() - n * interval '1 second', %s "
+                        'FROM generate_series(%s, %s) AS n'.format(Classroom._meta.db_table),
+                        [NAME, teacher.pk, offset, offset + size - 1],
+                    )
+            else:
+                Classroom.objects.bulk_create([Classroom(name=NAME, created_by=teacher) for _ in range(size)])
+            self.stdout.write('Seeded {} classrooms'.format(offset + size))
+
+        # Spread the enrollments over the whole table so none of them sit at the top.
+        step = max(1, classrooms // enrollments)
+        ids = Classroom.objects.filter(name=NAME).order_by('created_at').values_list('pk', flat=True)
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, classroom_id=classroom_id) for classroom_id in ids[::step][:enrollments]
+        ])
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE {}'.format(Classroom._meta.db_table))
+                cursor.execute('ANALYZE {}'.format(Enrollment._meta.db_table))
+        self.stdout.write('Seeding took {:.1f}s'.format(time.perf_counter() - started))
+
+    def cleanup(self):
+        classrooms = Classroom.objects.filter(name=NAME).values('pk')
+        delete_rows(Enrollment.objects.filter(classroom__in=classrooms), Classroom.objects.filter(name=NAME))
+
+    def time_page(self, queryset):
+        # What the paginated list view runs: a count and the first page.
+        started = time.perf_counter()
+        queryset.count()
+        list(queryset[:12])
+        return (time.perf_counter() - started) * 1000
@@ -0,0 +1,73 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from classroom.models import ENROLLMENT_MESSAGE, Classroom, Enrollment
+from pages.models import OutboundEmail
+from polls.management.benchmark import delete_rows
+
+NAME = 'benchmark-import'
+
+
+class Command(BaseCommand):
+    help = 'Compare enrolling --students one request at a time with the bulk import'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000)
+        parser.add_argument('--one-by-one', type=int, default=1000,
+                            help='How many of them to enroll one at a time, the rest is extrapolated')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded users and classrooms')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        teacher, _ = User.objects.get_or_create(username='benchmark', defaults={'email': 'benchmark@example.com'})
+        emails = ['{}-{}@example.com'.format(NAME, n) for n in range(options['students'])]
+
+        try:
+            started = time.perf_counter()
+            User.objects.bulk_create([User(username=email, email=email) for email in emails], batch_size=5000)
+            self.stdout.write('Seeded {} students in {:.1f}s'.format(len(emails), time.perf_counter() - started))
+
+            sample = emails[:options['one_by_one']]
+            classroom = Classroom.objects.create(name=NAME, created_by=teacher)
+            started = time.perf_counter()
+            for email in sample:
+                self.enroll_one(classroom, email)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                'one by one: {} students in {:.2f}s, {:.2f}ms each, ~{:.1f}s for {}'.format(
+                    len(sample), elapsed, elapsed * 1000 / len(sample), elapsed * len(emails) / len(sample),
+                    len(emails))))
+
+            classroom = Classroom.objects.create(name=NAME, created_by=teacher)
+            started = time.perf_counter()
+            counts = Enrollment.objects.bulk_enroll(classroom, emails, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS('bulk: {} students in {:.2f}s ({})'.format(
+                len(emails), time.perf_counter() - started, counts)))
+
+            started = time.perf_counter()
+            counts = Enrollment.objects.bulk_enroll(classroom, emails, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS('bulk again: {} students in {:.2f}s ({})'.format(
+                len(emails), time.perf_counter() - started, counts)))
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+    def enroll_one(self, classroom, email):
+        # What EnrollmentCreate does for each student.
+        student = get_user_model().objects.get(email=email)
+        classroom = Classroom.objects.get(pk=classroom.pk)
+        enrollment, created = Enrollment.objects.get_or_create(student=student, classroom=classroom)
+        if created:
+            OutboundEmail.objects.enqueue(subject='Site message', message=ENROLLMENT_MESSAGE.format(classroom.name),
+                                          from_email='site@website.domain', recipient_list=[email])
+
+    def cleanup(self):
+        delete_rows(
+            OutboundEmail.objects.filter(message=ENROLLMENT_MESSAGE.format(NAME)),
+            Enrollment.objects.filter(classroom__name=NAME),
+            Classroom.objects.filter(name=NAME),
+            get_user_model().objects.filter(username__startswith=NAME + '-'),
+        )
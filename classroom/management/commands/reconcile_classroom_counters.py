@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from classroom.models import Classroom
+
+
+class Command(BaseCommand):
+    help = 'Recompute Classroom.student_count and posts_count and repair the ones that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        checked = repaired = 0
+        last_id = None
+        while True:
+            # Walk the primary key instead of using OFFSET so each batch is an index range.
+            batch = Classroom.objects.order_by('pk')
+            if last_id is not None:
+                batch = batch.filter(pk__gt=last_id)
+            ids = list(batch.values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+
+            repaired += Classroom.objects.reconcile_counters(ids)
+            checked += len(ids)
+            last_id = ids[-1]
+            self.stdout.write('Checked {} classrooms, repaired {}'.format(checked, repaired))
+
+        self.stdout.write(self.style.SUCCESS('Repaired {} of {} classrooms'.format(repaired, checked)))
@@ -0,0 +1,46 @@
+# Generated by Django 3.1 on 2026-10-18 19:36
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    Classroom = apps.get_model('classroom', 'Classroom')
+    Enrollment = apps.get_model('classroom', 'Enrollment')
+    Post = apps.get_model('classroom', 'Post')
+
+    def count(model):
+        return Coalesce(Subquery(model.objects.filter(classroom=OuterRef('pk')).order_by().values('classroom').annotate(
+            count=Count('pk')).values('count')), 0)
+
+    Classroom.objects.update(student_count=count(Enrollment), posts_count=count(Post))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0008_auto_20201108_1645'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classroom',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='classroom',
+            name='student_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='classroom',
+            index=models.Index(fields=['-student_count'], name='classroom_student_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='classroom',
+            index=models.Index(fields=['-posts_count'], name='classroom_posts_count_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.1 on 2026-10-18 19:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0009_classroom_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['classroom', '-updated_on', '-id'], name='post_classroom_stream_idx'),
+        ),
+        # post_classroom_stream_idx covers classroom lookups, drop the plain FK index last.
+        migrations.AlterField(
+            model_name='post',
+            name='classroom',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='posts', to='classroom.classroom'),
+        ),
+    ]
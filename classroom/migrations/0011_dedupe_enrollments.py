@@ -0,0 +1,50 @@
+from django.db import migrations, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Keep the earliest enrollment of every (classroom, student) pair and
+    delete the rest, a batch of pairs per transaction so large tables are
+    never locked for the whole run.
+    """
+    Classroom = apps.get_model('classroom', 'Classroom')
+    Enrollment = apps.get_model('classroom', 'Enrollment')
+    db_alias = schema_editor.connection.alias
+    enrollments = Enrollment.objects.using(db_alias)
+
+    duplicates = enrollments.order_by().values('classroom_id', 'student_id').annotate(
+        count=Count('pk')).filter(count__gt=1).order_by('classroom_id', 'student_id')
+    while True:
+        pairs = list(duplicates.values_list('classroom_id', 'student_id')[:BATCH_SIZE])
+        if not pairs:
+            break
+
+        with transaction.atomic(using=db_alias):
+            extra = []
+            for classroom_id, student_id in pairs:
+                ids = list(enrollments.filter(classroom_id=classroom_id, student_id=student_id).order_by(
+                    'date_joined', 'pk').values_list('pk', flat=True))
+                extra.extend(ids[1:])
+            enrollments.filter(pk__in=extra).delete()
+
+            classroom_ids = {classroom_id for classroom_id, _ in pairs}
+            Classroom.objects.using(db_alias).filter(pk__in=classroom_ids).update(student_count=Coalesce(Subquery(
+                enrollments.filter(classroom=OuterRef('pk')).order_by().values('classroom').annotate(
+                    count=Count('pk')).values('count')), 0))
+
+
+class Migration(migrations.Migration):
+    # Every batch commits on its own.
+    atomic = False
+
+    dependencies = [
+        ('classroom', '0010_post_classroom_stream_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.1 on 2026-10-18 19:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0011_dedupe_enrollments'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='enrollment',
+            constraint=models.UniqueConstraint(fields=('classroom', 'student'), name='enrollment_classroom_student_uniq'),
+        ),
+        # The unique index leads with classroom, drop the plain FK index last.
+        migrations.AlterField(
+            model_name='enrollment',
+            name='classroom',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='classroom.classroom'),
+        ),
+    ]
@@ -1,12 +1,21 @@
+import threading
 import uuid
 
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest, Lower
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from taggit.managers import TaggableManager
 from taggit.models import GenericUUIDTaggedItemBase, TaggedItemBase
 
+from classroom.cache import invalidate_gradebooks
+from pages.models import OutboundEmail
+
+ENROLLMENT_MESSAGE = 'Congratulations you have enrolled to class {} successfully!'
+
 
 class UUIDTaggedItem(GenericUUIDTaggedItemBase, TaggedItemBase):
     class Meta:
@@ -14,6 +23,66 @@ class UUIDTaggedItem(GenericUUIDTaggedItemBase, TaggedItemBase):
         verbose_name_plural = _("Tags")
 
 
+# Classrooms being deleted in this thread. classroom.signals skips the counter
+# upkeep of their cascaded enrollments and posts.
+_deleting = threading.local()
+
+
+def deleting_classrooms():
+    if not hasattr(_deleting, 'ids'):
+        _deleting.ids = set()
+    return _deleting.ids
+
+
+class ClassroomManager(models.Manager):
+    def increment(self, classroom_id, **deltas):
+        """
+        Atomically add `deltas` to the counter columns of a classroom,
+        e.g. increment(pk, student_count=1). Counters never drop below zero,
+        so a drifted counter can not break deletes. Enrollments and posts
+        come and go through here, so it also touches updated_at.
+        """
+        return self.filter(pk=classroom_id).update(
+            updated_at=timezone.now(), **{field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()})
+
+    def member_ids(self, user):
+        """
+        Ids of the classrooms `user` is enrolled in or teaches.
+
+        A UNION of two index lookups, rather than OR-ing a join through
+        enrollments, which needs a DISTINCT and ends up scanning classrooms.
+        """
+        enrolled = Enrollment.objects.filter(student=user).order_by().values('classroom_id')
+        teaching = self.filter(created_by=user).order_by().values('pk')
+        return enrolled.union(teaching)
+
+    def actual_counts(self):
+        """
+        Expressions counting the enrollments and posts of each classroom.
+        """
+        def count(model):
+            return Coalesce(Subquery(model.objects.filter(classroom=OuterRef('pk')).order_by().values(
+                'classroom').annotate(count=Count('pk')).values('count')), 0)
+
+        return {'student_count': count(Enrollment), 'posts_count': count(Post)}
+
+    def reconcile_counters(self, classroom_ids):
+        """
+        Recompute the counters of the given classrooms from their enrollments
+        and posts. Returns the number of classrooms that had drifted.
+        """
+        counts = self.actual_counts()
+        drifted = list(self.filter(pk__in=classroom_ids).annotate(
+            actual_student_count=counts['student_count'],
+            actual_posts_count=counts['posts_count'],
+        ).filter(
+            ~Q(student_count=F('actual_student_count')) | ~Q(posts_count=F('actual_posts_count'))
+        ).values_list('pk', flat=True))
+        if drifted:
+            self.filter(pk__in=drifted).update(**counts)
+        return len(drifted)
+
+
 class Classroom(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=200)
@@ -21,25 +90,48 @@ class Classroom(models.Model):
     subject = models.CharField(max_length=200, blank=True)
     room = models.CharField(max_length=200, blank=True)
     is_active = models.BooleanField(default=True)
+    # Maintained by classroom.signals, repaired by reconcile_classroom_counters.
+    student_count = models.PositiveIntegerField(default=0, editable=False)
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
     students = models.ManyToManyField(get_user_model(), through='Enrollment', related_name='classes')
 
+    objects = ClassroomManager()
     tags = TaggableManager(through=UUIDTaggedItem)
 
     class Meta:
         ordering = ('-created_at', )
+        indexes = [
+            models.Index(fields=['-student_count'], name='classroom_student_count_idx'),
+            models.Index(fields=['-posts_count'], name='classroom_posts_count_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        try:
+            return super().delete(*args, **kwargs)
+        finally:
+            # A failed delete never reaches post_delete to unmark it.
+            deleting_classrooms().discard(pk)
+
     def get_absolute_url(self):
         return reverse('classroom_detail', args=[str(self.id)])
 
     def get_people_url(self):
         return reverse('classroom_people', args=[str(self.id)])
 
+    def get_roster_export_url(self):
+        return reverse('classroom_roster_export', args=[str(self.id)])
+
+    def get_import_url(self):
+        return reverse('classroom_enrollment_import', args=[str(self.id)])
+
     def get_update_url(self):
         return reverse('classroom_update', args=[str(self.id)])
 
@@ -47,26 +139,150 @@ class Classroom(models.Model):
         return reverse('classroom_delete', args=[str(self.id)])
 
     def can_update(self, user):
-        return user.is_superuser or self.created_by == user
+        return user.is_superuser or self.created_by_id == user.pk
 
     def can_delete(self, user):
-        return user.is_superuser or self.created_by == user
+        return user.is_superuser or self.created_by_id == user.pk
 
     def get_enrollment(self, user):
-        return self.enrollments.filter(student=user).first()
+        try:
+            return self.enrollments.get(student_id=user.pk)
+        except Enrollment.DoesNotExist:
+            return None
 
     def get_code(self):
         return str(self.id)
 
 
+class AlreadyEnrolled(Exception):
+    pass
+
+
+class EnrollmentManager(models.Manager):
+    def enroll(self, classroom, student):
+        """
+        Enroll `student` in `classroom` with a single insert, leaving
+        duplicates to the unique constraint. Raises AlreadyEnrolled.
+        """
+        try:
+            with transaction.atomic():
+                return self.create(classroom=classroom, student=student)
+        except IntegrityError:
+            raise AlreadyEnrolled
+
+    def roster(self, classroom_id, after=None, size=50):
+        """
+        Return up to `size` enrollments of a classroom with their students,
+        ordered by username, starting after the (username, id) position
+        `after`, and whether more enrollments follow.
+        """
+        enrollments = self._after_student(self.select_related('student').filter(classroom_id=classroom_id), after)
+        enrollments = list(enrollments[:size + 1])
+        return enrollments[:size], len(enrollments) > size
+
+    def _after_student(self, enrollments, after):
+        """
+        Order `enrollments` by username and student id, starting after the
+        (username, id) position `after` when there is one.
+        """
+        enrollments = enrollments.order_by('student__username', 'student__id')
+        if after is None:
+            return enrollments
+        username, pk = after
+        return enrollments.filter(
+            Q(student__username__gte=username),
+            Q(student__username__gt=username) | Q(student__username=username, student__id__gt=pk),
+        )
+
+    def bulk_enroll(self, classroom, emails, batch_size=1000):
+        """
+        Enroll the users with the given emails in `classroom`, `batch_size`
+        emails at a time, and queue their enrollment emails.
+
+        Returns a dict with the number of students enrolled, skipped because
+        they already were, and emails that matched no user.
+        """
+        emails = list(dict.fromkeys(email.strip().lower() for email in emails if email.strip()))
+        counts = {'created': 0, 'skipped': 0, 'unknown': 0}
+        for offset in range(0, len(emails), batch_size):
+            batch = emails[offset:offset + batch_size]
+            # Highest id first, so the oldest account wins when an email is shared.
+            # LOWER(email) is indexed by customuser_email_lower_idx.
+            students = dict(get_user_model().objects.annotate(email_lower=Lower('email')).filter(
+                email_lower__in=batch).order_by('-pk').values_list('email_lower', 'pk'))
+            enrolled = set(self.filter(classroom=classroom, student_id__in=students.values()).values_list(
+                'student_id', flat=True))
+            new = {email: pk for email, pk in students.items() if pk not in enrolled}
+            counts['unknown'] += len(batch) - len(students)
+            if new:
+                new = self._insert_enrollments(classroom, new)
+            counts['created'] += len(new)
+            counts['skipped'] += len(students) - len(new)
+        return counts
+
+    def _insert_enrollments(self, classroom, students):
+        """
+        Insert enrollments of `students`, a dict of email to user id, in
+        `classroom`, skipping any enrolled since they were looked up, and
+        queue their emails. Returns the students actually enrolled.
+        """
+        # bulk_create sends no post_save, so the counter is bumped here. The
+        # ids are generated here, so the rows that were not skipped as
+        # conflicts can be read back in the same transaction.
+        enrollments = [Enrollment(classroom=classroom, student_id=pk) for pk in students.values()]
+        with transaction.atomic():
+            self.bulk_create(enrollments, ignore_conflicts=True)
+            inserted = set(self.filter(pk__in=[enrollment.pk for enrollment in enrollments]).values_list(
+                'student_id', flat=True))
+            students = {email: pk for email, pk in students.items() if pk in inserted}
+            if students:
+                Classroom.objects.increment(classroom.pk, student_count=len(students))
+                OutboundEmail.objects.bulk_create([
+                    OutboundEmail(subject='Site message', message=ENROLLMENT_MESSAGE.format(classroom.name),
+                                  from_email='site@website.domain', recipients=[email])
+                    for email in students
+                ])
+        if students:
+            invalidate_gradebooks(classroom.pk)
+        return students
+
+    def export_rows(self, classroom_id, size=2000):
+        """
+        The roster of a classroom as tuples, read `size` rows at a time so
+        that it is never held in memory whole. Each chunk is a fresh keyset
+        query rather than a long lived cursor, so the connection may be
+        closed between chunks, as other requests on the thread do.
+        """
+        enrollments = self.filter(classroom_id=classroom_id).values_list(
+            'student__id', 'student__username', 'student__first_name', 'student__last_name', 'student__email',
+            'date_joined', 'marks',
+        )
+        after = None
+        while True:
+            rows = list(self._after_student(enrollments, after)[:size])
+            for row in rows:
+                yield row[1:]
+            if len(rows) < size:
+                return
+            after = rows[-1][1], rows[-1][0]
+
+
 class Enrollment(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     student = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='enrollments')
-    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, related_name='enrollments')
+    # Indexed by enrollment_classroom_student_uniq, which leads with classroom.
+    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, related_name='enrollments', db_index=False)
     date_joined = models.DateField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     marks = models.IntegerField(default=0)
 
+    objects = EnrollmentManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['classroom', 'student'], name='enrollment_classroom_student_uniq'),
+        ]
+
     def __str__(self):
         return ", ".join(
             [
@@ -79,10 +295,28 @@ class Enrollment(models.Model):
         return reverse('enroll_delete', args=[str(self.id)])
 
     def can_update(self, user):
-        return user.is_superuser or self.student == user
+        return user.is_superuser or self.student_id == user.pk
 
     def can_delete(self, user):
-        return user.is_superuser or self.student == user
+        return user.is_superuser or self.student_id == user.pk
+
+
+class PostManager(models.Manager):
+    def stream(self, classroom_id, after=None, size=20):
+        """
+        Return up to `size` posts of a classroom, most recently updated first,
+        starting after the (updated_on, id) position `after`, and whether
+        more posts follow.
+        """
+        posts = self.select_related('author').filter(classroom_id=classroom_id).order_by('-updated_on', '-id')
+        if after is not None:
+            updated_on, pk = after
+            posts = posts.filter(
+                Q(updated_on__lte=updated_on),
+                Q(updated_on__lt=updated_on) | Q(updated_on=updated_on, id__lt=pk),
+            )
+        posts = list(posts[:size + 1])
+        return posts[:size], len(posts) > size
 
 
 class Post(models.Model):
@@ -100,16 +334,22 @@ class Post(models.Model):
     status = models.IntegerField(choices=STATUS, default=0)
 
     author = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='posts')
-    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, related_name='posts')
+    # Indexed by post_classroom_stream_idx, which leads with classroom.
+    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, related_name='posts', db_index=False)
+
+    objects = PostManager()
 
     class Meta:
         ordering = ['-updated_on']
+        indexes = [
+            models.Index(fields=['classroom', '-updated_on', '-id'], name='post_classroom_stream_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
     def can_update(self, user):
-        return user.is_superuser or self.author == user
+        return user.is_superuser or self.author_id == user.pk
 
     def can_delete(self, user):
-        return user.is_superuser or self.author == user
+        return user.is_superuser or self.author_id == user.pk
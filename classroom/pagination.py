@@ -0,0 +1,38 @@
+import uuid
+
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(post):
+    """
+    The keyset position of a post in its classroom stream.
+    """
+    return '{}_{}'.format(post.updated_on.isoformat(), post.pk)
+
+
+def decode_cursor(value):
+    """
+    Return the (updated_on, id) pair of a cursor. Raises ValueError.
+    """
+    updated_on, _, pk = value.rpartition('_')
+    updated_on = parse_datetime(updated_on)
+    if updated_on is None:
+        raise ValueError('Invalid cursor {!r}'.format(value))
+    return updated_on, uuid.UUID(pk)
+
+
+def encode_roster_cursor(enrollment):
+    """
+    The keyset position of an enrollment in its classroom roster.
+    """
+    return '{}_{}'.format(enrollment.student.username, enrollment.student_id)
+
+
+def decode_roster_cursor(value):
+    """
+    Return the (username, student id) pair of a cursor. Raises ValueError.
+    """
+    username, _, pk = value.rpartition('_')
+    if not username:
+        raise ValueError('Invalid cursor {!r}'.format(value))
+    return username, int(pk)
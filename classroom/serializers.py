@@ -0,0 +1,5 @@
+from rest_framework import serializers
+
+
+class EnrollmentImportSerializer(serializers.Serializer):
+    emails = serializers.ListField(child=serializers.EmailField(), allow_empty=False, max_length=50000)
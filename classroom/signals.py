@@ -0,0 +1,76 @@
+from django.core.signals import request_finished
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from classroom.cache import invalidate_gradebooks
+from classroom.models import Classroom, Enrollment, Post, deleting_classrooms
+
+# Querysets deletes, cascades and students.remove() all go through the
+# collector, which sends post_delete for every row since these receivers
+# exist. students.add() bulk inserts enrollments without post_save, so it is
+# counted from m2m_changed instead.
+#
+# Deleting a classroom cascades to all of its enrollments and posts. Their
+# receivers skip classrooms that are being deleted, so the whole cascade costs
+# no query per row. Classroom.delete unmarks a classroom whose delete failed,
+# and the end of a request unmarks those of failed queryset deletes.
+
+
+@receiver(pre_delete, sender=Classroom)
+def mark_deleted_classroom(sender, instance, **kwargs):
+    deleting_classrooms().add(instance.pk)
+
+
+@receiver(post_delete, sender=Classroom)
+def unmark_deleted_classroom(sender, instance, **kwargs):
+    deleting_classrooms().discard(instance.pk)
+    invalidate_gradebooks(instance.pk)
+
+
+@receiver(request_finished)
+def unmark_deleted_classrooms(sender, **kwargs):
+    deleting_classrooms().clear()
+
+
+@receiver(post_save, sender=Enrollment)
+def count_new_enrollment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Classroom.objects.increment(instance.classroom_id, student_count=1)
+
+
+@receiver(post_delete, sender=Enrollment)
+def count_deleted_enrollment(sender, instance, **kwargs):
+    if instance.classroom_id not in deleting_classrooms():
+        Classroom.objects.increment(instance.classroom_id, student_count=-1)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_gradebook(sender, instance, raw=False, **kwargs):
+    if not raw and instance.classroom_id not in deleting_classrooms():
+        invalidate_gradebooks(instance.classroom_id)
+
+
+@receiver(m2m_changed, sender=Classroom.students.through)
+def count_added_students(sender, instance, action, reverse, pk_set, **kwargs):
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        for classroom_id in pk_set:
+            Classroom.objects.increment(classroom_id, student_count=1)
+        invalidate_gradebooks(*pk_set)
+    else:
+        Classroom.objects.increment(instance.pk, student_count=len(pk_set))
+        invalidate_gradebooks(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Classroom.objects.increment(instance.classroom_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    if instance.classroom_id not in deleting_classrooms():
+        Classroom.objects.increment(instance.classroom_id, posts_count=-1)
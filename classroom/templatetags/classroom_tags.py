@@ -1,13 +1,16 @@
+from classroom.cache import get_or_compute
 from classroom.models import Classroom
 from django import template
-from django.db.models import Count
 
 register = template.Library()
 
+# The sidebar aggregates are the same for every user, so they are shared
+# through the cache and recomputed at most once per timeout.
+
 
 @register.simple_tag
 def total_classrooms():
-    return Classroom.objects.count()
+    return get_or_compute('classroom:total', Classroom.objects.count)
 
 
 @register.inclusion_tag('classroom/latest_classrooms.html')
@@ -18,18 +21,20 @@ def show_latest_classrooms(count=5):
 
 @register.inclusion_tag('classroom/popular_classrooms.html')
 def show_popular_classrooms(count=5):
-    popular_classrooms = Classroom.objects.annotate(student_count=Count('students')).order_by('-student_count')[:count]
+    popular_classrooms = get_or_compute('classroom:popular:{}'.format(count), lambda: list(
+        Classroom.objects.order_by('-student_count')[:count]))
     return {'popular_classrooms': popular_classrooms}
 
 
 @register.inclusion_tag('classroom/recommended_classrooms.html')
 def show_recommended_classrooms(count=5):
-    recommended_classrooms = Classroom.objects.annotate(
-        posts_count=Count('posts')).order_by('-posts_count')[:count]
+    recommended_classrooms = get_or_compute('classroom:recommended:{}'.format(count), lambda: list(
+        Classroom.objects.order_by('-posts_count')[:count]))
     return {'recommended_classrooms': recommended_classrooms}
 
 
 @register.inclusion_tag('classroom/top_tags.html')
 def show_top_tags(count=10):
-    top_tags = Classroom.tags.most_common()[:count]
+    top_tags = get_or_compute('classroom:top_tags:{}'.format(count), lambda: list(
+        Classroom.tags.most_common()[:count]))
     return {'top_tags': top_tags}
@@ -6,10 +6,11 @@ from django.test import TestCase
 
 from classroom.factories import ClassroomFactory, UserFactory
 from classroom.forms import EnrollmentForm, PostForm
+from pages.models import OutboundEmail
 
 
 class EnrollmentFormTests(TestCase):
-    def test_valid_enrollment_form_with_new_enrollment_sends_email(self):
+    def test_valid_enrollment_form_with_new_enrollment_queues_email(self):
         student = UserFactory()
         classroom = ClassroomFactory()
 
@@ -21,8 +22,10 @@ class EnrollmentFormTests(TestCase):
         with self.assertLogs('classroom.forms', level='INFO') as cm:
             form.send_mail(student=student, classroom=classroom)
 
-        self.assertEqual(len(mail.outbox), 1)
-        self.assertEqual(mail.outbox[0].subject, 'Site message')
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.subject, 'Site message')
+        self.assertIn(student.email, email.recipients)
         self.assertGreaterEqual(len(cm.output), 1)
 
     def test_invalid_enrollment_form_does_not_sends_email(self):
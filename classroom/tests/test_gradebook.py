@@ -0,0 +1,131 @@
+import statistics
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from classroom.factories import ClassroomFactory, EnrollmentFactory, UserFactory
+from classroom.gradebook import get_gradebook, get_portfolio, histogram, quantile
+from classroom.models import Enrollment
+
+
+class GradebookStatisticsTests(TestCase):
+    def test_quantile_interpolates_between_ranks(self):
+        marks = [10, 20, 30, 40]
+        self.assertEqual(quantile(marks, 0), 10)
+        self.assertEqual(quantile(marks, 0.5), 25)
+        self.assertEqual(quantile(marks, 1), 40)
+        self.assertEqual(quantile([7], 0.9), 7)
+
+    def test_histogram_covers_every_mark_once(self):
+        marks = [0, 5, 9, 10, 50, 99, 100]
+        buckets = histogram(marks, 10)
+
+        self.assertEqual(len(buckets), 10)
+        self.assertEqual(sum(bucket['count'] for bucket in buckets), len(marks))
+        self.assertEqual(buckets[0], {'low': 0, 'high': 10, 'count': 3})
+        self.assertEqual(buckets[-1], {'low': 90, 'high': 100, 'count': 2})
+        self.assertEqual(histogram([4, 4], 10), [{'low': 4, 'high': 4, 'count': 2}])
+
+
+class GradebookTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = UserFactory()
+        self.classroom = ClassroomFactory(created_by=self.teacher)
+        self.marks = [35, 50, 65, 80, 95, 95]
+        self.enrollments = [EnrollmentFactory(classroom=self.classroom, marks=mark) for mark in self.marks]
+
+    def test_gradebook_summarizes_the_marks(self):
+        gradebook = get_gradebook(self.classroom.pk)
+        summary = gradebook['summary']
+
+        self.assertEqual(summary['count'], 6)
+        self.assertAlmostEqual(summary['mean'], statistics.mean(self.marks), places=2)
+        self.assertEqual(summary['median'], statistics.median(self.marks))
+        self.assertAlmostEqual(summary['stddev'], statistics.pstdev(self.marks), places=2)
+        self.assertEqual((summary['min'], summary['max']), (35, 95))
+        self.assertEqual(summary['percentiles']['50'], summary['median'])
+        self.assertEqual(sum(bucket['count'] for bucket in gradebook['histogram']), 6)
+
+    def test_gradebook_lists_students_by_marks_with_z_scores(self):
+        students = get_gradebook(self.classroom.pk)['students']
+        mean, stddev = statistics.mean(self.marks), statistics.pstdev(self.marks)
+
+        self.assertEqual([student['marks'] for student in students], self.marks)
+        self.assertEqual(students[0]['id'], self.enrollments[0].student_id)
+        self.assertAlmostEqual(students[0]['z_score'], (35 - mean) / stddev, places=3)
+        self.assertAlmostEqual(sum(student['z_score'] for student in students), 0, places=2)
+
+    def test_gradebook_of_an_empty_classroom(self):
+        gradebook = get_gradebook(ClassroomFactory().pk)
+        self.assertEqual(gradebook, {'summary': None, 'histogram': [], 'students': []})
+
+    def test_gradebook_is_cached_until_an_enrollment_changes(self):
+        get_gradebook(self.classroom.pk)
+        with self.assertNumQueries(0):
+            get_gradebook(self.classroom.pk)
+
+        self.enrollments[0].marks = 100
+        self.enrollments[0].save()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_gradebook(self.classroom.pk)['summary']['max'], 100)
+
+    def test_gradebook_is_dropped_by_bulk_enrollment(self):
+        get_gradebook(self.classroom.pk)
+        student = UserFactory()
+        Enrollment.objects.bulk_enroll(self.classroom, [student.email])
+
+        self.assertEqual(get_gradebook(self.classroom.pk)['summary']['count'], 7)
+
+    def test_portfolio_pools_the_classrooms(self):
+        other = ClassroomFactory(created_by=self.teacher)
+        other_marks = [10, 20, 30]
+        for mark in other_marks:
+            EnrollmentFactory(classroom=other, marks=mark)
+        empty = ClassroomFactory(created_by=self.teacher)
+
+        portfolio = get_portfolio([self.classroom, other, empty])
+        everything = self.marks + other_marks
+
+        self.assertEqual(portfolio['overall']['count'], 9)
+        self.assertEqual(portfolio['overall']['mean'], round(statistics.mean(everything), 2))
+        self.assertEqual(portfolio['overall']['stddev'], round(statistics.pstdev(everything), 2))
+        self.assertEqual((portfolio['overall']['min'], portfolio['overall']['max']), (10, 95))
+        self.assertEqual(
+            [c['id'] for c in portfolio['classrooms']], [str(self.classroom.pk), str(other.pk), str(empty.pk)])
+        self.assertIsNone(portfolio['classrooms'][2]['summary'])
+
+    def test_portfolio_is_not_pooled_from_rounded_summaries(self):
+        # Pooling the rounded means and deviations of these gives 41.13 and 29.45.
+        groups = [[24, 33, 13, 32, 93], [77, 55, 2]]
+        classrooms = [ClassroomFactory(created_by=self.teacher) for _ in groups]
+        for classroom, marks in zip(classrooms, groups):
+            for mark in marks:
+                EnrollmentFactory(classroom=classroom, marks=mark)
+        everything = groups[0] + groups[1]
+
+        overall = get_portfolio(classrooms)['overall']
+
+        self.assertEqual(overall['mean'], round(statistics.mean(everything), 2))
+        self.assertEqual(overall['stddev'], round(statistics.pstdev(everything), 2))
+
+    def test_gradebook_api_is_for_the_teacher(self):
+        url = '/api/v1/classroom/{}/gradebook/'.format(self.classroom.pk)
+
+        self.client.force_login(self.teacher)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['summary']['count'], 6)
+
+        self.client.force_login(self.enrollments[0].student)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_portfolio_api_covers_the_classrooms_taught(self):
+        ClassroomFactory()
+        self.client.force_login(self.teacher)
+
+        response = self.client.get('/api/v1/classroom/gradebook/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['id'] for c in response.json()['classrooms']], [str(self.classroom.pk)])
@@ -1,10 +1,19 @@
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from classroom.factories import (ClassroomFactory, EnrollmentFactory,
                                  PostFactory, UserFactory, get_super_user)
-from classroom.models import Classroom, Enrollment, Post
+from classroom.models import AlreadyEnrolled, Classroom, Enrollment, Post
+from pages.models import OutboundEmail
 
 
 class ClassroomModelTest(TestCase):
@@ -263,3 +272,215 @@ class PostTests(TestCase):
 
         self.assertEqual(self.post_1.updated_on.minute, timezone.now().minute)
         self.assertEqual(self.post_2.updated_on.minute, timezone.now().minute)
+
+
+class ClassroomCounterTests(TestCase):
+    def setUp(self):
+        self.classroom = ClassroomFactory()
+
+    def assertCounts(self, student_count, posts_count):
+        self.classroom.refresh_from_db()
+        self.assertEqual(self.classroom.student_count, student_count)
+        self.assertEqual(self.classroom.posts_count, posts_count)
+
+    def test_enrollments_are_counted(self):
+        enrollment = EnrollmentFactory(classroom=self.classroom)
+        EnrollmentFactory(classroom=self.classroom)
+        self.assertCounts(2, 0)
+
+        enrollment.delete()
+        self.assertCounts(1, 0)
+
+    def test_students_added_and_removed_through_the_relation_are_counted(self):
+        students = UserFactory.create_batch(3)
+
+        self.classroom.students.add(*students)
+        self.assertCounts(3, 0)
+
+        students[0].classes.add(ClassroomFactory(), self.classroom)
+        self.assertCounts(3, 0)
+
+        self.classroom.students.remove(students[1])
+        self.assertCounts(2, 0)
+
+        self.classroom.students.clear()
+        self.assertCounts(0, 0)
+
+    def test_posts_are_counted(self):
+        post = PostFactory(classroom=self.classroom)
+        PostFactory(classroom=self.classroom)
+        self.assertCounts(0, 2)
+
+        post.delete()
+        self.assertCounts(0, 1)
+
+    def test_bulk_and_cascade_deletes_are_counted(self):
+        students = EnrollmentFactory.create_batch(4, classroom=self.classroom)
+        PostFactory.create_batch(2, classroom=self.classroom, author=students[0].student)
+        self.assertCounts(4, 2)
+
+        Enrollment.objects.filter(pk__in=[students[1].pk, students[2].pk]).delete()
+        self.assertCounts(2, 2)
+
+        # Deleting a user cascades to their enrollment and posts.
+        students[0].student.delete()
+        self.assertCounts(1, 0)
+
+    def test_deleting_a_classroom_does_not_count_its_cascade(self):
+        def fill(classroom, count):
+            User = get_user_model()
+            usernames = ['{}-{}'.format(classroom.pk, n) for n in range(count)]
+            User.objects.bulk_create([User(username=username, email=username + '@email.com') for username in usernames])
+            students = list(User.objects.filter(username__in=usernames))
+            Enrollment.objects.bulk_create([Enrollment(classroom=classroom, student=student) for student in students])
+            Post.objects.bulk_create([
+                Post(classroom=classroom, author=student, title='Post', content='Text') for student in students])
+
+        classroom = ClassroomFactory()
+        fill(classroom, 500)
+
+        ContentType.objects.clear_cache()
+        with CaptureQueriesContext(connection) as queries:
+            classroom.delete()
+
+        # The enrollments, the posts, their content type, their tags, the
+        # classroom and a DELETE per batch of enrollments or posts, but
+        # nothing per row.
+        self.assertEqual(len(queries), 5 + 2 * 500 // GET_ITERATOR_CHUNK_SIZE)
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+
+        # Other classrooms are counted again afterwards.
+        EnrollmentFactory(classroom=self.classroom).delete()
+        PostFactory(classroom=self.classroom)
+        self.assertCounts(0, 1)
+
+    def test_a_failed_classroom_delete_keeps_counting(self):
+        enrollment = EnrollmentFactory(classroom=self.classroom)
+
+        with mock.patch('django.db.models.sql.DeleteQuery.delete_batch', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                self.classroom.delete()
+        enrollment.delete()
+
+        self.assertCounts(0, 0)
+
+    def test_a_failed_queryset_delete_keeps_counting_after_the_request(self):
+        enrollment = EnrollmentFactory(classroom=self.classroom)
+
+        with mock.patch('django.db.models.sql.DeleteQuery.delete_batch', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                Classroom.objects.filter(pk=self.classroom.pk).delete()
+        self.client.get('/')
+        enrollment.delete()
+
+        self.assertCounts(0, 0)
+
+    def test_counters_do_not_go_negative(self):
+        enrollment = EnrollmentFactory(classroom=self.classroom)
+        Classroom.objects.filter(pk=self.classroom.pk).update(student_count=0)
+
+        enrollment.delete()
+        self.assertCounts(0, 0)
+
+    def test_reconcile_repairs_drifted_counters(self):
+        EnrollmentFactory.create_batch(3, classroom=self.classroom)
+        PostFactory(classroom=self.classroom)
+        untouched = ClassroomFactory()
+        Classroom.objects.filter(pk=self.classroom.pk).update(student_count=10, posts_count=0)
+
+        out = StringIO()
+        call_command('reconcile_classroom_counters', batch_size=1, stdout=out)
+
+        self.assertCounts(3, 1)
+        self.assertIn('Repaired 1 of 2 classrooms', out.getvalue())
+        untouched.refresh_from_db()
+        self.assertEqual(untouched.student_count, 0)
+
+
+class BulkEnrollmentTests(TestCase):
+    def setUp(self):
+        self.classroom = ClassroomFactory()
+        self.students = [UserFactory(email='student{}@email.com'.format(n)) for n in range(5)]
+
+    def test_bulk_enroll_reports_created_skipped_and_unknown(self):
+        EnrollmentFactory(classroom=self.classroom, student=self.students[0])
+        emails = [student.email for student in self.students] + ['nobody@email.com']
+
+        # Two lookups, and three inserts and a read back of the enrollments
+        # wrapped in a savepoint for each batch.
+        with self.assertNumQueries(16):
+            counts = Enrollment.objects.bulk_enroll(self.classroom, emails, batch_size=3)
+
+        self.assertEqual(counts, {'created': 4, 'skipped': 1, 'unknown': 1})
+        self.assertEqual(Enrollment.objects.filter(classroom=self.classroom).count(), 5)
+        self.classroom.refresh_from_db()
+        self.assertEqual(self.classroom.student_count, 5)
+        self.assertEqual(
+            sorted(email for email, in OutboundEmail.objects.values_list('recipients')),
+            sorted([student.email] for student in self.students[1:]))
+
+    def test_bulk_enroll_matches_emails_case_insensitively_once(self):
+        counts = Enrollment.objects.bulk_enroll(
+            self.classroom, [' Student1@Email.com', 'student1@email.com', '', 'STUDENT2@EMAIL.COM'])
+
+        self.assertEqual(counts, {'created': 2, 'skipped': 0, 'unknown': 0})
+        self.assertEqual(set(self.classroom.students.all()), {self.students[1], self.students[2]})
+
+    def test_bulk_enroll_twice_enrolls_nobody_again(self):
+        emails = [student.email for student in self.students]
+        Enrollment.objects.bulk_enroll(self.classroom, emails)
+        with self.assertNumQueries(2):
+            counts = Enrollment.objects.bulk_enroll(self.classroom, emails)
+
+        self.assertEqual(counts, {'created': 0, 'skipped': 5, 'unknown': 0})
+        self.classroom.refresh_from_db()
+        self.assertEqual(self.classroom.student_count, 5)
+
+
+    def test_bulk_enroll_counts_only_the_enrollments_it_inserted(self):
+        bulk_create = Enrollment.objects.bulk_create
+
+        def enroll_concurrently(enrollments, **kwargs):
+            # Another request enrolls a student after the lookup.
+            Enrollment.objects.create(classroom=self.classroom, student=self.students[0])
+            return bulk_create(enrollments, **kwargs)
+
+        emails = [student.email for student in self.students]
+        with mock.patch.object(Enrollment.objects, 'bulk_create', side_effect=enroll_concurrently):
+            counts = Enrollment.objects.bulk_enroll(self.classroom, emails)
+
+        self.assertEqual(counts, {'created': 4, 'skipped': 1, 'unknown': 0})
+        self.assertEqual(Enrollment.objects.filter(classroom=self.classroom).count(), 5)
+        self.classroom.refresh_from_db()
+        self.assertEqual(self.classroom.student_count, 5)
+        self.assertEqual(
+            sorted(email for email, in OutboundEmail.objects.values_list('recipients')),
+            sorted([student.email] for student in self.students[1:]))
+
+
+class EnrollmentUniquenessTests(TestCase):
+    def setUp(self):
+        self.classroom = ClassroomFactory()
+        self.student = UserFactory()
+
+    def test_enrolling_twice_raises_already_enrolled(self):
+        enrollment = Enrollment.objects.enroll(self.classroom, self.student)
+
+        with self.assertRaises(AlreadyEnrolled):
+            Enrollment.objects.enroll(self.classroom, self.student)
+
+        self.assertEqual(list(Enrollment.objects.filter(classroom=self.classroom)), [enrollment])
+        self.classroom.refresh_from_db()
+        self.assertEqual(self.classroom.student_count, 1)
+
+    def test_database_rejects_duplicate_enrollments(self):
+        EnrollmentFactory(classroom=self.classroom, student=self.student)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Enrollment.objects.bulk_create([Enrollment(classroom=self.classroom, student=self.student)])
+
+    def test_get_enrollment(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(self.classroom.get_enrollment(self.student))
+
+        enrollment = EnrollmentFactory(classroom=self.classroom, student=self.student)
+        self.assertEqual(self.classroom.get_enrollment(self.student), enrollment)
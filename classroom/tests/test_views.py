@@ -1,18 +1,32 @@
+import json
 import uuid
+from unittest import mock
 
-from django.contrib.messages import get_messages
+from asgiref.sync import SyncToAsync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.messages import INFO, get_messages
 from django.contrib.messages.storage.fallback import FallbackStorage
-from django.test import RequestFactory, TestCase
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import (RequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import resolve, reverse
 
+from classroom.cache import get_or_compute, lock_key
 from classroom.factories import (ClassroomFactory, EnrollmentFactory,
                                  PostFactory, UserFactory, get_super_user)
 from classroom.forms import EnrollmentForm, PostForm
-from classroom.models import Classroom, Enrollment
+from classroom.models import Classroom, Enrollment, Post
 from classroom.views import (ClassroomCreate, ClassroomDelete,
                              ClassroomDetailView, ClassroomListView,
                              ClassroomPeopleView, ClassroomUpdate,
-                             EnrollmentCreate, EnrollmentDelete)
+                             EnrollmentCreate, EnrollmentDelete,
+                             classroom_page_validators)
+from main.asgi import StreamingASGIHandler, application
 
 
 class ClassroomListTests(TestCase):
@@ -51,6 +65,37 @@ class ClassroomListTests(TestCase):
         view = resolve(reverse('classroom_list'))
         self.assertEqual(view.func.__name__, ClassroomListView.as_view().__name__)
 
+    def test_classroom_list_by_tag_only_shows_member_classrooms(self):
+        self.classroom_2.tags.add('physics')
+        self.classroom_3.tags.add('physics')
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('classroom_list_by_tag', args=['physics']))
+
+        self.assertEqual(list(response.context['object_list']), [self.classroom_2])
+
+    def test_classroom_list_shows_everything_to_superuser(self):
+        self.client.force_login(get_super_user())
+        response = self.client.get(reverse('classroom_list'))
+        self.assertEqual(len(response.context['object_list']), 3)
+
+    def test_classroom_list_membership_query_is_a_union_without_distinct(self):
+        EnrollmentFactory.create_batch(20, student=self.user)
+        self.client.force_login(self.user)
+        cache.clear()
+        self.client.get(reverse('classroom_list'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('classroom_list'))
+
+        self.assertEqual(response.context['paginator'].count, 22)
+        membership = [query['sql'] for query in queries if 'classroom_enrollment' in query['sql']]
+        # The paginator count and the page itself.
+        self.assertEqual(len(membership), 2)
+        for sql in membership:
+            self.assertIn('UNION', sql)
+            self.assertNotIn('DISTINCT', sql)
+
 
 class ClassroomDetailTests(TestCase):
     def setUp(self):
@@ -259,6 +304,118 @@ class ClassroomPeopleTests(TestCase):
         self.assertNotContains(response, 'Hi I should not be on this page!')
         self.assertEqual(no_response.status_code, 404)
 
+    @override_settings(CLASSROOM_ROSTER_PAGE_SIZE=1)
+    def test_classroom_people_pages_through_the_roster_by_username(self):
+        first, second = sorted([self.user_1, self.user_2], key=lambda user: user.username)
+        self.client.force_login(self.user)
+
+        response = self.client.get(self.classroom.get_people_url())
+        self.assertEqual([e.student for e in response.context['enrollments']], [first])
+        self.assertContains(response, '2 students')
+
+        response = self.client.get(response.context['next_page_url'])
+        self.assertEqual([e.student for e in response.context['enrollments']], [second])
+        self.assertIsNone(response.context['next_page_url'])
+
+    def test_classroom_people_with_an_invalid_cursor_is_not_found(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.classroom.get_people_url(), {'after': 'nobody'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_roster_export_streams_csv_to_the_teacher(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.classroom.get_roster_export_url())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'username,first_name,last_name,email,date_joined,marks')
+        self.assertEqual(
+            [line.split(',')[0] for line in lines[1:]], sorted([self.user_1.username, self.user_2.username]))
+
+    def test_roster_export_streams_ndjson(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.classroom.get_roster_export_url(), {'format': 'ndjson'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({row['email'] for row in rows}, {self.user_1.email, self.user_2.email})
+        self.assertEqual(rows[0]['date_joined'], self.enrollment_1.date_joined.isoformat())
+
+    def test_roster_export_is_not_found_for_students(self):
+        self.client.force_login(self.user_1)
+        response = self.client.get(self.classroom.get_roster_export_url())
+        self.assertEqual(response.status_code, 404)
+
+
+class ClassroomRosterExportASGITests(TransactionTestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.classroom = ClassroomFactory(created_by=self.user)
+        students = [UserFactory.build(username='student{}'.format(n)) for n in range(150)]
+        get_user_model().objects.bulk_create(students)
+        Enrollment.objects.bulk_create([
+            Enrollment(classroom=self.classroom, student=student)
+            for student in get_user_model().objects.exclude(pk=self.user.pk)
+        ])
+
+    def tearDown(self):
+        # The view and its stream keep their connection on asgiref's shared thread.
+        SyncToAsync.single_thread_executor.submit(connections.close_all).result()
+
+    async def get(self, path):
+        await sync_to_async(self.client.force_login, thread_sensitive=True)(self.user)
+        cookie = '{}={}'.format(settings.SESSION_COOKIE_NAME, self.client.cookies[settings.SESSION_COOKIE_NAME].value)
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        })
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+        return communicator
+
+    async def read_body(self, communicator):
+        body = b''
+        while True:
+            message = await communicator.receive_output(timeout=2)
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                return body
+
+    async def test_roster_export_streams_through_asgi(self):
+        communicator = await self.get(self.classroom.get_roster_export_url())
+
+        start = await communicator.receive_output(timeout=2)
+        self.assertEqual(start['status'], 200)
+        lines = (await self.read_body(communicator)).decode().splitlines()
+        self.assertEqual(lines[0], 'username,first_name,last_name,email,date_joined,marks')
+        self.assertEqual(len(lines), 151)
+
+    @override_settings(CLASSROOM_ROSTER_EXPORT_CHUNK_SIZE=10)
+    async def test_roster_export_survives_a_concurrent_request(self):
+        # Every request closes the connections of the thread it finishes on,
+        # the one the export runs its queries on, when they are not reused.
+        with mock.patch.object(StreamingASGIHandler, 'stream_batch_size', 1), \
+                mock.patch.dict(connections.databases['default'], CONN_MAX_AGE=0):
+            export = await self.get(self.classroom.get_roster_export_url())
+            await export.receive_output(timeout=2)
+            header = await export.receive_output(timeout=2)
+
+            other = await self.get(self.classroom.get_people_url())
+            start = await other.receive_output(timeout=2)
+            await self.read_body(other)
+
+            lines = (header['body'] + await self.read_body(export)).decode().splitlines()
+
+        self.assertEqual(start['status'], 200)
+        self.assertEqual(len(lines), 151)
+        usernames = [line.split(',')[0] for line in lines[1:]]
+        self.assertEqual(usernames, sorted(set(usernames)))
+
 
 class EnrollmentCreateTests(TestCase):
     def setUp(self):
@@ -349,6 +506,50 @@ class EnrollmentCreateTests(TestCase):
         self.assertEqual(Enrollment.objects.count(), 1)
 
 
+class EnrollmentImportTests(TestCase):
+    def setUp(self):
+        self.teacher = UserFactory()
+        self.classroom = ClassroomFactory(created_by=self.teacher)
+        self.students = [UserFactory(email='student{}@email.com'.format(n)) for n in range(3)]
+
+    def upload(self, content):
+        return SimpleUploadedFile('students.csv', content.encode(), content_type='text/csv')
+
+    def test_teacher_imports_a_csv_with_an_email_column(self):
+        self.client.force_login(self.teacher)
+        content = 'name,email\nA,student0@email.com\nB,student1@email.com\nC,nobody@email.com\n'
+
+        response = self.client.post(self.classroom.get_import_url(), {'file': self.upload(content)}, follow=True)
+
+        self.assertRedirects(response, self.classroom.get_people_url())
+        self.assertContains(response, 'Enrolled 2 students. 0 were already enrolled and 1 emails')
+        self.assertEqual(set(self.classroom.students.all()), set(self.students[:2]))
+
+    def test_a_csv_without_a_header_is_read_from_its_first_column(self):
+        self.client.force_login(self.teacher)
+        self.client.post(self.classroom.get_import_url(), {'file': self.upload('student2@email.com\n')})
+        self.assertEqual(list(self.classroom.students.all()), [self.students[2]])
+
+    def test_students_can_not_import(self):
+        self.client.force_login(self.students[0])
+        response = self.client.get(self.classroom.get_import_url())
+        self.assertEqual(response.status_code, 404)
+
+    def test_api_imports_a_list_of_emails(self):
+        self.client.force_login(self.teacher)
+        url = '/api/v1/classroom/{}/enrollments/'.format(self.classroom.pk)
+
+        response = self.client.post(
+            url, {'emails': [student.email for student in self.students]}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'created': 3, 'skipped': 0, 'unknown': 0})
+
+        self.client.force_login(self.students[0])
+        response = self.client.post(url, {'emails': ['a@email.com']}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+
 class EnrollmentDeleteTests(TestCase):
     def setUp(self):
         self.superuser = get_super_user()
@@ -429,3 +630,229 @@ class EnrollmentDeleteTests(TestCase):
         messages = list(get_messages(response.wsgi_request))
         self.assertEqual(len(messages), 1)
         self.assertEqual(str(messages[0]), 'You have unenrolled successfully!')
+
+
+class ClassroomSidebarCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory()
+        self.classroom = ClassroomFactory(created_by=self.user)
+        self.classroom.tags.add('physics')
+        EnrollmentFactory(classroom=self.classroom)
+        PostFactory(classroom=self.classroom, author=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_sidebar_aggregates_are_shared_between_requests(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(reverse('classroom_list'))
+        with CaptureQueriesContext(connection) as second:
+            response = self.client.get(reverse('classroom_list'))
+
+        # Popular, recommended and top tags come from the cache.
+        self.assertEqual(len(first) - len(second), 3)
+        self.assertContains(response, 'physics')
+
+    @mock.patch('classroom.cache.time')
+    def test_stale_value_is_served_while_another_request_recomputes(self, clock):
+        compute = mock.Mock(side_effect=[1, 2])
+        clock.time.return_value = 1000
+
+        self.assertEqual(get_or_compute('test:key', compute, timeout=60), 1)
+
+        clock.time.return_value = 1061
+        cache.add(lock_key('test:key'), 1)
+        self.assertEqual(get_or_compute('test:key', compute, timeout=60), 1)
+        self.assertEqual(compute.call_count, 1)
+
+        cache.delete(lock_key('test:key'))
+        self.assertEqual(get_or_compute('test:key', compute, timeout=60), 2)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_fresh_value_is_not_recomputed(self):
+        compute = mock.Mock(return_value=1)
+
+        get_or_compute('test:key', compute, timeout=60)
+        get_or_compute('test:key', compute, timeout=60)
+        self.assertEqual(compute.call_count, 1)
+
+
+@override_settings(CLASSROOM_POSTS_PAGE_SIZE=5)
+class ClassroomPostStreamTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.classroom = ClassroomFactory()
+        self.client.force_login(self.user)
+
+    def create_posts(self, count):
+        posts = PostFactory.create_batch(count, classroom=self.classroom)
+        return sorted(posts, key=lambda post: (post.updated_on, post.pk), reverse=True)
+
+    def test_detail_renders_the_first_page_of_posts(self):
+        posts = self.create_posts(7)
+
+        response = self.client.get(self.classroom.get_absolute_url())
+
+        self.assertEqual(response.context['posts'], posts[:5])
+        self.assertContains(response, 'Load more')
+        self.assertNotContains(response, posts[5].title)
+
+    def test_detail_query_count_does_not_grow_with_posts(self):
+        self.create_posts(5)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.classroom.get_absolute_url())
+
+        self.create_posts(50)
+        with self.assertNumQueries(len(few)):
+            self.client.get(self.classroom.get_absolute_url())
+
+    def test_load_more_walks_the_whole_stream(self):
+        posts = self.create_posts(12)
+        # Ties on updated_on are broken by id.
+        Post.objects.filter(pk__in=[post.pk for post in posts[4:7]]).update(updated_on=posts[4].updated_on)
+        posts = sorted(Post.objects.filter(classroom=self.classroom), key=lambda post: (post.updated_on, post.pk),
+                       reverse=True)
+
+        context = self.client.get(self.classroom.get_absolute_url()).context
+        seen, url = [str(post.pk) for post in context['posts']], context['more_posts_url']
+        while url:
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+            seen += [post['id'] for post in response.json()['posts']]
+            url = response.json()['next']
+
+        self.assertEqual(seen, [str(post.pk) for post in posts])
+
+    def test_load_more_returns_an_html_fragment(self):
+        posts = self.create_posts(7)
+        url = self.client.get(self.classroom.get_absolute_url()).context['more_posts_url']
+
+        response = self.client.get(url)
+
+        self.assertTemplateUsed(response, 'classroom/_post_stream.html')
+        self.assertContains(response, posts[6].title)
+        self.assertNotContains(response, 'Load more')
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse('classroom_posts', args=[self.classroom.pk]), {'after': 'nope'})
+        bad_id = self.client.get(reverse('classroom_posts', args=[self.classroom.pk]),
+                                 {'after': '2020-01-01T00:00:00_garbage'})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(bad_id.status_code, 404)
+
+
+class ClassroomConditionalTests(TestCase):
+    def setUp(self):
+        self.teacher = UserFactory()
+        self.classroom = ClassroomFactory(created_by=self.teacher)
+        self.post = PostFactory(classroom=self.classroom)
+        self.url = self.classroom.get_absolute_url()
+        self.client.force_login(self.teacher)
+
+    def assertChanged(self, etag):
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unchanged_classroom_is_not_modified(self):
+        response = self.client.get(self.url)
+
+        # Session, user and the validators.
+        with self.assertNumQueries(3):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_classroom_changes_with_its_posts_and_enrollments(self):
+        etag = self.client.get(self.url)['ETag']
+        self.post.title = 'Edited'
+        self.post.save()
+        self.assertChanged(etag)
+
+        etag = self.client.get(self.url)['ETag']
+        self.post.delete()
+        self.assertChanged(etag)
+
+        etag = self.client.get(self.url)['ETag']
+        EnrollmentFactory(classroom=self.classroom)
+        self.assertChanged(etag)
+
+    def test_flash_messages_are_not_swallowed(self):
+        request = RequestFactory().get(self.url)
+        setattr(request, 'session', 'session')
+        setattr(request, '_messages', FallbackStorage(request))
+        request.user = self.teacher
+        self.assertIsNotNone(classroom_page_validators(request, self.classroom.pk)[0])
+
+        request._messages.add(INFO, 'Post successfully created!')
+        self.assertEqual(classroom_page_validators(request, self.classroom.pk), (None, None))
+
+
+class ClassroomDetailQueryTests(TestCase):
+    def setUp(self):
+        self.teacher = UserFactory()
+        self.classroom = ClassroomFactory(created_by=self.teacher)
+        self.student = UserFactory()
+        self.enrollment = EnrollmentFactory(classroom=self.classroom, student=self.student)
+        PostFactory.create_batch(3, classroom=self.classroom)
+
+    def enroll_students(self, count):
+        User = get_user_model()
+        offset = User.objects.count()
+        usernames = ['student{}'.format(offset + i) for i in range(count)]
+        User.objects.bulk_create([User(username=username, email=username + '@email.com') for username in usernames])
+        # SQLite does not hand back the ids of bulk created rows.
+        Enrollment.objects.bulk_create([
+            Enrollment(classroom=self.classroom, student_id=pk)
+            for pk in User.objects.filter(username__in=usernames).values_list('pk', flat=True)
+        ])
+
+    def test_get_runs_the_same_queries_for_10_and_10000_students(self):
+        self.client.force_login(self.student)
+
+        self.enroll_students(10)
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(self.classroom.get_absolute_url())
+        self.assertEqual(response.context['enrollment'], self.enrollment)
+        self.assertContains(response, 'Un Enroll')
+
+        self.enroll_students(9990)
+        # Session, user, the validators, classroom, enrollment, the first page
+        # of posts and the profile linked from the navbar.
+        with self.assertNumQueries(7):
+            response = self.client.get(self.classroom.get_absolute_url())
+        self.assertEqual(len(small), 7)
+        self.assertContains(response, 'Un Enroll')
+
+    def test_teacher_sees_delete_without_loading_students(self):
+        self.enroll_students(10)
+        self.client.force_login(self.teacher)
+
+        with self.assertNumQueries(7):
+            response = self.client.get(self.classroom.get_absolute_url())
+
+        self.assertTrue(response.context['is_teacher'])
+        self.assertTrue(response.context['can_edit'])
+        self.assertContains(response, self.classroom.get_delete_url())
+
+    def test_post_runs_a_fixed_number_of_queries(self):
+        self.client.force_login(self.student)
+        data = {'title': 'Homework', 'content': 'Due on Monday'}
+
+        self.enroll_students(10)
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.classroom.get_absolute_url(), data)
+
+        self.enroll_students(9990)
+        with self.assertNumQueries(len(small)):
+            response = self.client.post(self.classroom.get_absolute_url(), data)
+
+        self.assertRedirects(response, self.classroom.get_absolute_url())
+        self.assertEqual(Post.objects.filter(title='Homework').count(), 2)
+
+    def test_invalid_post_renders_the_form_again(self):
+        self.client.force_login(self.student)
+
+        response = self.client.post(self.classroom.get_absolute_url(), {'title': ''})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
@@ -2,8 +2,10 @@ from django.urls import path
 
 from classroom.views import (ClassroomCreate, ClassroomDelete,
                              ClassroomDetailView, ClassroomListView,
-                             ClassroomPeopleView, ClassroomUpdate,
-                             EnrollmentCreate, EnrollmentDelete)
+                             ClassroomPeopleView, ClassroomPostsView,
+                             ClassroomRosterExportView, ClassroomUpdate,
+                             EnrollmentCreate, EnrollmentDelete,
+                             EnrollmentImportView)
 
 urlpatterns = [
     path('', ClassroomListView.as_view(), name='classroom_list'),
@@ -12,6 +14,9 @@ urlpatterns = [
     path('<uuid:pk>/update/', ClassroomUpdate.as_view(), name='classroom_update'),
     path('<uuid:pk>/delete/', ClassroomDelete.as_view(), name='classroom_delete'),
     path('<uuid:pk>/people/', ClassroomPeopleView.as_view(), name='classroom_people'),
+    path('<uuid:pk>/people/export/', ClassroomRosterExportView.as_view(), name='classroom_roster_export'),
+    path('<uuid:pk>/people/import/', EnrollmentImportView.as_view(), name='classroom_enrollment_import'),
+    path('<uuid:pk>/posts/', ClassroomPostsView.as_view(), name='classroom_posts'),
     path('create/', ClassroomCreate.as_view(), name='classroom_create'),
     path('enroll/', EnrollmentCreate.as_view(), name='enroll'),
     path('enroll/<uuid:pk>/delete/', EnrollmentDelete.as_view(), name='enroll_delete'),
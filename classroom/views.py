@@ -1,19 +1,36 @@
+import csv
+import itertools
+import json
 import logging
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
-from django.db.models import Q
-from django.http import Http404, HttpResponseForbidden
-from django.shortcuts import get_object_or_404, redirect
-from django.urls import reverse_lazy
-from django.views.generic import DetailView, FormView, ListView
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import OuterRef, Subquery
+from django.http import (Http404, HttpResponseForbidden, JsonResponse,
+                         StreamingHttpResponse)
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse, reverse_lazy
+from django.utils.decorators import method_decorator
+from django.utils.http import urlencode
+from django.views.generic import DetailView, FormView, ListView, View
 from django.views.generic.edit import (CreateView, DeleteView, FormMixin,
                                        UpdateView)
+from rest_framework import generics
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from taggit.models import Tag
 
-from classroom.forms import EnrollmentForm, PostForm
-from classroom.models import Classroom, Enrollment
+from classroom.forms import EnrollmentForm, EnrollmentImportForm, PostForm
+from classroom.gradebook import get_gradebook, get_portfolio
+from classroom.models import AlreadyEnrolled, Classroom, Enrollment, Post
+from classroom.pagination import (decode_cursor, decode_roster_cursor,
+                                  encode_cursor, encode_roster_cursor)
+from classroom.serializers import EnrollmentImportSerializer
+from pages.conditional import conditional, page_validators
 
 logger = logging.getLogger(__name__)
 
@@ -37,9 +54,7 @@ class ClassroomListView(LoginRequiredMixin, ListView):
         if self.request.user.is_superuser:
             return queryset
 
-        return queryset.filter(
-            Q(students=self.request.user) | Q(created_by=self.request.user)
-        ).distinct()
+        return queryset.filter(pk__in=Classroom.objects.member_ids(self.request.user))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -52,7 +67,80 @@ class ClassroomPeopleView(LoginRequiredMixin, DetailView):
     context_object_name = 'classroom'
     template_name = 'classroom/classroom_people.html'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        after = self.request.GET.get('after')
+        try:
+            enrollments, has_more = Enrollment.objects.roster(
+                self.object.pk, after=decode_roster_cursor(after) if after else None,
+                size=getattr(settings, 'CLASSROOM_ROSTER_PAGE_SIZE', 50))
+        except ValueError:
+            raise Http404
+
+        context['enrollments'] = enrollments
+        context['next_page_url'] = None
+        if has_more:
+            context['next_page_url'] = '{}?{}'.format(
+                self.object.get_people_url(), urlencode({'after': encode_roster_cursor(enrollments[-1])}))
+        context['can_export'] = self.object.can_update(self.request.user)
+        return context
+
+
+class Echo:
+    """
+    A file-like object that hands back what is written to it, so csv.writer
+    can produce rows for a streaming response.
+    """
+
+    def write(self, value):
+        return value
+
+
+ROSTER_COLUMNS = ('username', 'first_name', 'last_name', 'email', 'date_joined', 'marks')
+
 
+class ClassroomRosterExportView(LoginRequiredMixin, View):
+    """
+    The whole roster of a classroom as CSV, or NDJSON with ?format=ndjson,
+    streamed row by row for teachers.
+    """
+
+    def get(self, request, *args, **kwargs):
+        classroom = get_object_or_404(Classroom, pk=kwargs['pk'])
+        if not classroom.can_update(request.user):
+            logger.warning('Possible attack: \nuser: %s\nobj: %s', request.user, classroom)
+            raise Http404
+
+        rows = Enrollment.objects.export_rows(
+            classroom.pk, size=getattr(settings, 'CLASSROOM_ROSTER_EXPORT_CHUNK_SIZE', 2000))
+        if request.GET.get('format') == 'ndjson':
+            lines = (json.dumps(dict(zip(ROSTER_COLUMNS, row)), cls=DjangoJSONEncoder) + '\n' for row in rows)
+            response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+            extension = 'ndjson'
+        else:
+            writer = csv.writer(Echo())
+            lines = (writer.writerow(row) for row in itertools.chain([ROSTER_COLUMNS], rows))
+            response = StreamingHttpResponse(lines, content_type='text/csv')
+            extension = 'csv'
+        response['Content-Disposition'] = 'attachment; filename="roster-{}.{}"'.format(classroom.pk, extension)
+        return response
+
+
+def classroom_page_validators(request, pk):
+    """
+    The classroom's updated_at, which enrollments and deleted posts touch
+    through the counters, and the last edit of its posts, from one query
+    on the primary key and the post stream index.
+    """
+    last_post = Post.objects.filter(classroom=OuterRef('pk')).order_by('-updated_on').values('updated_on')[:1]
+    row = Classroom.objects.filter(pk=pk).annotate(last_post=Subquery(last_post)).values_list(
+        'updated_at', 'last_post').first()
+    if row is None:
+        return None, None
+    return page_validators(request, *row, last_modified=max(value for value in row if value is not None))
+
+
+@method_decorator(conditional(classroom_page_validators), name='get')
 class ClassroomDetailView(LoginRequiredMixin, FormMixin, DetailView):
     model = Classroom
     context_object_name = 'classroom'
@@ -61,12 +149,13 @@ class ClassroomDetailView(LoginRequiredMixin, FormMixin, DetailView):
     form_class = PostForm
 
     def get_success_url(self):
-        return self.get_object().get_absolute_url()
+        return self.object.get_absolute_url()
 
     def post(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
             return HttpResponseForbidden()
 
+        self.object = self.get_object()
         form = self.get_form()
         if form.is_valid():
             return self.form_valid(form)
@@ -74,7 +163,7 @@ class ClassroomDetailView(LoginRequiredMixin, FormMixin, DetailView):
         return self.form_invalid(form)
 
     def form_valid(self, form):
-        form.instance.classroom = self.get_object()
+        form.instance.classroom = self.object
         form.instance.author = self.request.user
         form.save()
         messages.success(self.request, self.success_message)
@@ -83,12 +172,56 @@ class ClassroomDetailView(LoginRequiredMixin, FormMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        # Each of these is answered without loading the teacher or the students.
         context['can_edit'] = self.object.can_update(self.request.user)
+        context['is_teacher'] = self.object.created_by_id == self.request.user.pk
         context['enrollment'] = self.object.get_enrollment(self.request.user)
+        context.update(get_post_stream(self.object.pk))
         logger.info('can_edit:%s', context['can_edit'])
         return context
 
 
+def get_post_stream(classroom_id, after=None):
+    posts, has_more = Post.objects.stream(
+        classroom_id, after=after, size=getattr(settings, 'CLASSROOM_POSTS_PAGE_SIZE', 20))
+    more_posts_url = None
+    if has_more:
+        more_posts_url = '{}?{}'.format(
+            reverse('classroom_posts', args=[classroom_id]), urlencode({'after': encode_cursor(posts[-1])}))
+    return {'posts': posts, 'more_posts_url': more_posts_url}
+
+
+class ClassroomPostsView(LoginRequiredMixin, View):
+    """
+    The next page of a classroom stream, as an HTML fragment for the
+    "load more" button or as JSON.
+    """
+
+    def get(self, request, *args, **kwargs):
+        after = request.GET.get('after')
+        try:
+            stream = get_post_stream(kwargs['pk'], after=decode_cursor(after) if after else None)
+        except ValueError:
+            raise Http404
+
+        if 'application/json' in request.META.get('HTTP_ACCEPT', ''):
+            return JsonResponse({
+                'posts': [
+                    {
+                        'id': post.id,
+                        'title': post.title,
+                        'content': post.content,
+                        'author': str(post.author),
+                        'created_on': post.created_on,
+                        'updated_on': post.updated_on,
+                    }
+                    for post in stream['posts']
+                ],
+                'next': stream['more_posts_url'],
+            })
+        return render(request, 'classroom/_post_stream.html', stream)
+
+
 class ClassroomCreate(LoginRequiredMixin, SuccessMessageMixin, CreateView):
     model = Classroom
     fields = ['name', 'section', 'subject', 'room']
@@ -142,9 +275,9 @@ class EnrollmentCreate(LoginRequiredMixin, SuccessMessageMixin, FormView):
         student = self.request.user
         classroom = get_object_or_404(Classroom, id=code)
 
-        enrollment, created = Enrollment.objects.get_or_create(student=student, classroom=classroom)
-
-        if not created:
+        try:
+            enrollment = Enrollment.objects.enroll(classroom, student)
+        except AlreadyEnrolled:
             logger.info('%s already enrolled in %s! redirecting...', student, classroom.name)
             messages.info(self.request, 'You are already enrolled in {}!'.format(classroom))
             return redirect(reverse_lazy('classroom_list'))
@@ -154,6 +287,80 @@ class EnrollmentCreate(LoginRequiredMixin, SuccessMessageMixin, FormView):
         return super().form_valid(form)
 
 
+class EnrollmentImportView(LoginRequiredMixin, FormView):
+    """
+    Enroll a whole class at once from a CSV of student emails.
+    """
+    template_name = 'classroom/enrollment_import_form.html'
+    form_class = EnrollmentImportForm
+
+    def get_classroom(self):
+        classroom = get_object_or_404(Classroom, pk=self.kwargs['pk'])
+        if not classroom.can_update(self.request.user):
+            logger.warning('Possible attack: \nuser: %s\nobj: %s', self.request.user, classroom)
+            raise Http404
+        return classroom
+
+    def get(self, request, *args, **kwargs):
+        self.classroom = self.get_classroom()
+        return super().get(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        self.classroom = self.get_classroom()
+        return super().post(request, *args, **kwargs)
+
+    def get_success_url(self):
+        return self.classroom.get_people_url()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['classroom'] = self.classroom
+        return context
+
+    def form_valid(self, form):
+        counts = Enrollment.objects.bulk_enroll(self.classroom, form.get_emails())
+        logger.info('Imported enrollments into %s: %s', self.classroom.pk, counts)
+        messages.success(
+            self.request,
+            'Enrolled {created} students. {skipped} were already enrolled and {unknown} emails '
+            'did not match any user.'.format(**counts))
+        return super().form_valid(form)
+
+
+class EnrollmentImportAPIView(generics.GenericAPIView):
+    serializer_class = EnrollmentImportSerializer
+
+    def post(self, request, *args, **kwargs):
+        classroom = get_object_or_404(Classroom, pk=kwargs['pk'])
+        if not classroom.can_update(request.user):
+            raise PermissionDenied
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(Enrollment.objects.bulk_enroll(classroom, serializer.validated_data['emails']))
+
+
+class GradebookAPIView(APIView):
+    """
+    Statistics of the marks of a classroom and the z-score of every student.
+    """
+
+    def get(self, request, *args, **kwargs):
+        classroom = get_object_or_404(Classroom, pk=kwargs['pk'])
+        if not classroom.can_update(request.user):
+            raise PermissionDenied
+        return Response(get_gradebook(classroom.pk))
+
+
+class PortfolioGradebookAPIView(APIView):
+    """
+    Statistics of the marks of every classroom the user teaches.
+    """
+
+    def get(self, request, *args, **kwargs):
+        classrooms = Classroom.objects.filter(created_by=request.user).only('id', 'name').order_by('name', 'id')
+        return Response(get_portfolio(list(classrooms)))
+
+
 class EnrollmentDelete(LoginRequiredMixin, SuccessMessageMixin, DeleteView):
     model = Enrollment
     template_name = 'classroom/enrollment_confirm_delete.html'
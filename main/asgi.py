@@ -7,10 +7,63 @@ For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 """
 
+import itertools
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
 
-application = get_asgi_application()
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    Django's ASGI handler, except that a streaming response is read in the
+    thread that ran the view, `stream_batch_size` parts at a time, instead of
+    on the event loop. Its iterator may then query the database, as the
+    roster export does, which would otherwise raise SynchronousOnlyOperation.
+    """
+    stream_batch_size = 100
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            response_headers.append((bytes(header), bytes(value)))
+        for c in response.cookies.values():
+            response_headers.append((b'Set-Cookie', c.output(header='').encode('ascii').strip()))
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': response_headers})
+
+        parts = iter(response)
+        read_parts = sync_to_async(lambda: list(itertools.islice(parts, self.stream_batch_size)),
+                                   thread_sensitive=True)
+        batch = await read_parts()
+        while batch:
+            for part in batch:
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            batch = await read_parts()
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+django.setup(set_prefix=False)
+django_application = StreamingASGIHandler()
+
+# Imported after Django is set up since it loads models.
+from polls.streams import RESULTS_STREAM_PATH, results_stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Live results are streamed outside of Django's request cycle so an idle
+    # subscriber only costs a coroutine instead of a worker thread.
+    if scope['type'] == 'http' and RESULTS_STREAM_PATH.match(scope['path']):
+        return await results_stream(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -74,6 +74,18 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.TokenAuthentication',
     ],
+    # orjson encodes and decodes JSON several times faster than the stdlib,
+    # see manage.py benchmark_renderers. Views may still set renderer_classes
+    # or parser_classes to rest_framework's JSONRenderer and JSONParser.
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 # django-allauth config
@@ -143,6 +155,19 @@ DATABASES = {
 }
 
 
+# Cache
+# Defaults to a per process cache. Point every worker at the same shared
+# cache in production, e.g. CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache
+# and CACHE_LOCATION=memcached:11211
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', default=''),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -196,6 +221,51 @@ ACCOUNT_LOGOUT_REDIRECT = 'pages:home'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'admin@sitedomain.com'
 RECIPIENT_LIST = ['gurupratap.matharu@gmail.com']
+# Mail is queued in pages.OutboundEmail and sent by manage.py send_queued_mail.
+# A failed email is retried after RETRY_DELAY seconds, doubling every attempt,
+# and a worker holds the emails it picked for LEASE seconds.
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_LEASE = 300
+
+# Classroom
+# Seconds the sidebar leaderboards are served before one request recomputes
+# them, and how long that request may hold the recompute lock.
+CLASSROOM_LEADERBOARD_CACHE_TIMEOUT = 60
+CLASSROOM_LEADERBOARD_LOCK_TIMEOUT = 10
+# Posts rendered with a classroom and fetched by each "load more".
+CLASSROOM_POSTS_PAGE_SIZE = 20
+# Students listed on each page of a classroom roster.
+CLASSROOM_ROSTER_PAGE_SIZE = 50
+# Students read by each query of a roster export.
+CLASSROOM_ROSTER_EXPORT_CHUNK_SIZE = 2000
+# Histogram buckets of a gradebook, and how long one is cached for at most.
+# Any change to an enrollment of the classroom drops it sooner.
+CLASSROOM_GRADEBOOK_BUCKETS = 10
+CLASSROOM_GRADEBOOK_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Polls
+# Buffer votes in each worker and write them in bulk every FLUSH_INTERVAL
+# milliseconds or MAX_VOTES votes. Set POLLS_VOTE_BUFFER=0 for synchronous writes.
+POLLS_VOTE_BUFFER_ENABLED = int(os.environ.get('POLLS_VOTE_BUFFER', default=0))
+POLLS_VOTE_BUFFER_FLUSH_INTERVAL = 200
+POLLS_VOTE_BUFFER_MAX_VOTES = 1000
+# Seconds a results snapshot lives in the cache. Votes refresh or invalidate it.
+POLLS_RESULTS_CACHE_TIMEOUT = 300
+# Live results streams push an update at most every INTERVAL milliseconds
+# and send a keepalive comment after KEEPALIVE idle seconds.
+POLLS_RESULTS_STREAM_INTERVAL = 1000
+POLLS_RESULTS_STREAM_KEEPALIVE = 15
+# Questions per page of the polls API, and the most a client may ask for
+# with ?page_size=.
+POLLS_API_PAGE_SIZE = 20
+POLLS_API_MAX_PAGE_SIZE = 100
+
+# Users
+# Users or profiles per page of the users API, and the most a client may ask
+# for with ?page_size=.
+USERS_API_PAGE_SIZE = 20
+USERS_API_MAX_PAGE_SIZE = 100
 
 LOGGING = {
     'version': 1,
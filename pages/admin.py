@@ -1,3 +1,16 @@
 from django.contrib import admin
 
-# Register your models here.
+from pages.models import OutboundEmail
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    model = OutboundEmail
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at',)
+    list_filter = ('status', 'created_at',)
+    search_fields = ('subject', 'last_error',)
+    readonly_fields = ('attempts', 'last_error', 'created_at', 'sent_at',)
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+
+
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
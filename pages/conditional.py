@@ -0,0 +1,46 @@
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+
+def conditional(validators):
+    """
+    django.views.decorators.http.condition, with the ETag and the
+    Last-Modified time of a request coming from a single call of
+    `validators(request, *args, **kwargs)`. It returns (etag, last_modified)
+    and either may be None, so both can be read with one query.
+
+    Responses are marked private, no-cache so clients keep them but check
+    back on every use instead of guessing a freshness from Last-Modified.
+    """
+    def get_validators(request, *args, **kwargs):
+        if not hasattr(request, '_validators'):
+            request._validators = validators(request, *args, **kwargs)
+        return request._validators
+
+    decorator = condition(
+        etag_func=lambda request, *args, **kwargs: get_validators(request, *args, **kwargs)[0],
+        last_modified_func=lambda request, *args, **kwargs: get_validators(request, *args, **kwargs)[1],
+    )
+    return lambda view: cache_control(private=True, no_cache=True)(decorator(view))
+
+
+def make_etag(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def page_validators(request, *parts, last_modified=None):
+    """
+    Validators of an HTML page rendered from `parts`. The ETag also covers
+    the user and the CSRF cookie the page was rendered for, and a page with
+    flash messages waiting to be shown is always rendered.
+    """
+    # len() reads the messages without marking them as shown.
+    if len(get_messages(request)):
+        return None, None
+    # Sets the CSRF cookie on a first visit, as rendering the page would.
+    get_token(request)
+    return make_etag(request.user.pk, request.META['CSRF_COOKIE'], *parts), last_modified
@@ -1,7 +1,8 @@
 import logging
 
 from django import forms
-from django.core.mail import send_mail
+
+from pages.models import OutboundEmail
 
 logger = logging.getLogger(__name__)
 
@@ -11,10 +12,10 @@ class ContactForm(forms.Form):
     message = forms.CharField(label='Message', max_length=600, widget=forms.Textarea)
 
     def send_mail(self):
-        logger.info('sending contact email...')
+        logger.info('queueing contact email...')
         message = 'From: {0}\n{1}'.format(self.cleaned_data['name'], self.cleaned_data['message'],)
-        send_mail(subject='Site message', message=message, from_email='site@website.domain',
-                  recipient_list=['gurupratap.matharu@gmail.com'], fail_silently=False)
+        OutboundEmail.objects.enqueue(subject='Site message', message=message, from_email='site@website.domain',
+                                      recipient_list=['gurupratap.matharu@gmail.com'])
 
 
 class FeedbackForm(forms.Form):
@@ -22,7 +23,7 @@ class FeedbackForm(forms.Form):
     message = forms.CharField(label='Message', max_length=600, widget=forms.Textarea)
 
     def send_mail(self):
-        logger.info('sending feedback mail...')
+        logger.info('queueing feedback mail...')
         message = 'From: {0}\n{1}'.format(self.cleaned_data['name'], self.cleaned_data['message'],)
-        send_mail(subject='Site message', message=message, from_email='site@website.domain',
-                  recipient_list=['gurupratap.matharu@gmail.com'], fail_silently=False)
+        OutboundEmail.objects.enqueue(subject='Site message', message=message, from_email='site@website.domain',
+                                      recipient_list=['gurupratap.matharu@gmail.com'])
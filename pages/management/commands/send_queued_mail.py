@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pages.models import OutboundEmail
+
+
+class Command(BaseCommand):
+    help = 'Send the emails waiting in the outbox, in batches over one SMTP connection each'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to sleep when there is nothing due')
+        parser.add_argument('--once', action='store_true', help='Drain what is due and exit')
+
+    def handle(self, *args, **options):
+        totals = {'sent': 0, 'retried': 0, 'failed': 0}
+        while True:
+            started = time.perf_counter()
+            counts = OutboundEmail.objects.send_batch(options['batch_size'])
+            for key, value in counts.items():
+                totals[key] += value
+
+            if any(counts.values()):
+                self.stdout.write('Sent {sent}, retried {retried}, failed {failed} in {ms:.0f}ms, {backlog} pending'.format(
+                    ms=(time.perf_counter() - started) * 1000, backlog=OutboundEmail.objects.backlog(), **counts))
+            if sum(counts.values()) < options['batch_size']:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            'Sent {sent}, retried {retried}, failed {failed}'.format(**totals)))
@@ -1,3 +1,126 @@
-from django.db import models
+import logging
+import uuid
+from datetime import timedelta
 
-# Create your models here.
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class OutboundEmailManager(models.Manager):
+    def enqueue(self, subject, message, recipient_list, from_email=None):
+        return self.create(subject=subject, message=message, recipients=list(recipient_list),
+                           from_email=from_email or settings.DEFAULT_FROM_EMAIL)
+
+    def claim(self, size):
+        """
+        Lease up to `size` due emails to the caller by pushing their next
+        attempt past EMAIL_OUTBOX_LEASE seconds. A worker that dies while
+        sending leaves them to be picked up again once the lease runs out.
+        """
+        now = timezone.now()
+        lease = getattr(settings, 'EMAIL_OUTBOX_LEASE', 300)
+        with transaction.atomic():
+            due = self.filter(status='pending', next_attempt_at__lte=now).order_by('next_attempt_at')
+            if connection.features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True)
+            emails = list(due[:size])
+            self.filter(pk__in=[email.pk for email in emails]).update(next_attempt_at=now + timedelta(seconds=lease))
+        return emails
+
+    def send_batch(self, size=100):
+        """
+        Send up to `size` due emails over a single SMTP connection. Failed
+        emails are retried with an exponential backoff until they have been
+        tried EMAIL_OUTBOX_MAX_ATTEMPTS times.
+
+        Returns a dict with the number of emails sent, retried and failed.
+        """
+        counts = {'sent': 0, 'retried': 0, 'failed': 0}
+        emails = self.claim(size)
+        if not emails:
+            return counts
+
+        mail_connection = get_connection()
+        try:
+            mail_connection.open()
+        except Exception as exc:
+            logger.exception('Could not connect to the mail server')
+            for email in emails:
+                counts[email.defer(exc)] += 1
+            return counts
+
+        try:
+            for email in emails:
+                try:
+                    EmailMessage(email.subject, email.message, email.from_email, email.recipients,
+                                 connection=mail_connection).send()
+                except Exception as exc:
+                    logger.warning('Could not send %s: %s', email.pk, exc)
+                    counts[email.defer(exc)] += 1
+                else:
+                    email.status, email.sent_at = 'sent', timezone.now()
+                    email.attempts += 1
+                    email.save(update_fields=['status', 'sent_at', 'attempts'])
+                    counts['sent'] += 1
+        finally:
+            mail_connection.close()
+        return counts
+
+    def backlog(self):
+        return self.filter(status='pending').count()
+
+
+class OutboundEmail(models.Model):
+    """
+    An email waiting to be sent by the send_queued_mail worker, so that
+    requests never wait on the mail server.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    subject = models.CharField(max_length=200)
+    message = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OutboundEmailManager()
+
+    class Meta:
+        ordering = ('-created_at',)
+        indexes = [
+            models.Index(fields=['next_attempt_at'], name='outbound_email_due_idx',
+                         condition=models.Q(status='pending')),
+        ]
+
+    def __str__(self):
+        return self.subject
+
+    def defer(self, error):
+        """
+        Record a failed attempt and schedule the next one, or give up after
+        EMAIL_OUTBOX_MAX_ATTEMPTS. Returns 'retried' or 'failed'.
+        """
+        self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5):
+            self.status = 'failed'
+            logger.error('Giving up on %s after %s attempts', self.pk, self.attempts)
+        else:
+            delay = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60) * 2 ** (self.attempts - 1)
+            self.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        self.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+        return 'retried' if self.status == 'pending' else 'failed'
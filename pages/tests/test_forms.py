@@ -2,10 +2,11 @@ from django.core import mail
 from django.test import TestCase
 
 from pages.forms import ContactForm, FeedbackForm
+from pages.models import OutboundEmail
 
 
 class ContactFormTests(TestCase):
-    def test_valid_contact_form_sends_email(self):
+    def test_valid_contact_form_queues_email(self):
         form = ContactForm({
             'name': 'Luke Skywalker',
             'message': 'Love your website!'
@@ -13,8 +14,10 @@ class ContactFormTests(TestCase):
         self.assertTrue(form.is_valid())
         with self.assertLogs('pages.forms', level='INFO') as cm:
             form.send_mail()
-        self.assertEqual(len(mail.outbox), 1)
-        self.assertEqual(mail.outbox[0].subject, 'Site message')
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.subject, 'Site message')
+        self.assertIn('Luke Skywalker', email.message)
         self.assertGreaterEqual(len(cm.output), 1)
 
     def test_invalid_contact_form_does_not_sends_email(self):
@@ -25,7 +28,7 @@ class ContactFormTests(TestCase):
 
 
 class FeedbackFormTests(TestCase):
-    def test_valid_feedback_form_sends_email(self):
+    def test_valid_feedback_form_queues_email(self):
         form = FeedbackForm({
             'name': 'Luke Skywalker',
             'message': 'Love your website!'
@@ -33,8 +36,10 @@ class FeedbackFormTests(TestCase):
         self.assertTrue(form.is_valid())
         with self.assertLogs('pages.forms', level='INFO') as cm:
             form.send_mail()
-        self.assertEqual(len(mail.outbox), 1)
-        self.assertEqual(mail.outbox[0].subject, 'Site message')
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.subject, 'Site message')
+        self.assertIn('Luke Skywalker', email.message)
         self.assertGreaterEqual(len(cm.output), 1)
 
     def test_invalid_feedback_form_does_not_sends_email(self):
@@ -0,0 +1,71 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from pages.models import OutboundEmail
+
+
+class OutboundEmailTests(TestCase):
+    def setUp(self):
+        self.email = OutboundEmail.objects.enqueue(
+            subject='Site message', message='Hello', recipient_list=['luke@email.com'])
+
+    def test_enqueue_stores_a_pending_email(self):
+        self.assertEqual(self.email.status, 'pending')
+        self.assertEqual(self.email.recipients, ['luke@email.com'])
+        self.assertEqual(self.email.from_email, 'admin@sitedomain.com')
+        self.assertEqual(OutboundEmail.objects.backlog(), 1)
+
+    def test_send_batch_sends_due_emails_over_one_connection(self):
+        OutboundEmail.objects.enqueue(subject='Another', message='Hi', recipient_list=['leia@email.com'])
+
+        with mock.patch('pages.models.get_connection', wraps=mail.get_connection) as get_connection:
+            counts = OutboundEmail.objects.send_batch()
+
+        self.assertEqual(counts, {'sent': 2, 'retried': 0, 'failed': 0})
+        get_connection.assert_called_once_with()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[-1].to, ['leia@email.com'])
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, 'sent')
+        self.assertIsNotNone(self.email.sent_at)
+        self.assertEqual(OutboundEmail.objects.backlog(), 0)
+
+    def test_send_batch_skips_emails_that_are_not_due(self):
+        OutboundEmail.objects.filter(pk=self.email.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(OutboundEmail.objects.send_batch(), {'sent': 0, 'retried': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 0)
+
+    @override_settings(EMAIL_OUTBOX_RETRY_DELAY=60, EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_emails_are_retried_with_backoff_then_given_up(self):
+        with mock.patch('pages.models.EmailMessage.send', side_effect=OSError('Connection refused')):
+            counts = OutboundEmail.objects.send_batch()
+            self.assertEqual(counts, {'sent': 0, 'retried': 1, 'failed': 0})
+            self.email.refresh_from_db()
+            self.assertEqual(self.email.status, 'pending')
+            self.assertEqual(self.email.last_error, 'Connection refused')
+            self.assertGreater(self.email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+            OutboundEmail.objects.filter(pk=self.email.pk).update(next_attempt_at=timezone.now())
+            counts = OutboundEmail.objects.send_batch()
+
+        self.assertEqual(counts, {'sent': 0, 'retried': 0, 'failed': 1})
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, 'failed')
+        self.assertEqual(self.email.attempts, 2)
+
+    def test_claimed_emails_are_not_sent_again_until_the_lease_expires(self):
+        self.assertEqual(OutboundEmail.objects.claim(10), [self.email])
+        self.assertEqual(OutboundEmail.objects.claim(10), [])
+
+    def test_send_queued_mail_once_drains_the_outbox(self):
+        out = StringIO()
+        call_command('send_queued_mail', '--once', stdout=out)
+
+        self.assertIn('Sent 1, retried 0, failed 0', out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
@@ -10,7 +10,7 @@ class ChoiceInline(admin.TabularInline):
 class QuestionAdmin(admin.ModelAdmin):
     model = Question
     inlines = (ChoiceInline,)
-    list_display = ('question_text', 'slug', 'pub_date', 'created_by')
+    list_display = ('question_text', 'slug', 'pub_date', 'created_by', 'vote_shards')
     list_filter = ('pub_date',)
     prepopulated_fields = {"slug": ("question_text",)}
     search_fields = ('question_text',)
@@ -0,0 +1,138 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class VoteBuffer:
+    """
+    Collects vote increments per choice in the current process and writes
+    them to the database in one bulk UPDATE, either every `flush_interval`
+    milliseconds from a background thread or as soon as `max_votes` votes
+    are waiting.
+    """
+
+    def __init__(self, flush_interval=200, max_votes=1000):
+        self.flush_interval = flush_interval
+        self.max_votes = max_votes
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = Counter()
+        self._questions = set()
+        self._depth = 0
+        self._thread = None
+        self._stopped = threading.Event()
+
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.flushed_votes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        atexit.register(self.stop)
+        if self.flush_interval:
+            self._thread = threading.Thread(target=self._run, name='vote-buffer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval / 1000):
+            close_old_connections()
+            self.flush()
+
+    def add(self, choice_id, question_id):
+        with self._lock:
+            self._pending[choice_id] += 1
+            self._questions.add(question_id)
+            self._depth += 1
+            full = self._depth >= self.max_votes
+        if full:
+            self.flush()
+
+    def pending(self, choice_ids):
+        with self._lock:
+            return {choice_id: self._pending[choice_id] for choice_id in choice_ids if choice_id in self._pending}
+
+    def flush(self):
+        from polls.models import Choice
+        from polls.results import invalidate_results
+
+        with self._flush_lock:
+            with self._lock:
+                increments, self._pending = self._pending, Counter()
+                questions, self._questions = self._questions, set()
+                depth, self._depth = self._depth, 0
+            if not increments:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                Choice.objects.bulk_increment(increments)
+            except Exception:
+                logger.exception('Could not flush %s buffered votes, keeping them for the next flush', depth)
+                with self._lock:
+                    self._pending.update(increments)
+                    self._questions.update(questions)
+                    self._depth += depth
+                self.failed_flushes += 1
+                return 0
+
+            invalidate_results(*questions)
+            elapsed = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.flushed_votes += depth
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            logger.debug('Flushed %s votes over %s choices in %.1fms', depth, len(increments), elapsed)
+            return depth
+
+    def stats(self):
+        with self._lock:
+            depth = self._depth
+        return {
+            'depth': depth,
+            'flushes': self.flushes,
+            'failed_flushes': self.failed_flushes,
+            'flushed_votes': self.flushed_votes,
+            'last_flush_ms': round(self.last_flush_ms, 3),
+            'max_flush_ms': round(self.max_flush_ms, 3),
+        }
+
+
+_vote_buffer = None
+_vote_buffer_lock = threading.Lock()
+
+
+def get_vote_buffer():
+    """
+    Return the process wide vote buffer, or None when votes should be
+    written synchronously.
+    """
+    global _vote_buffer
+
+    if not getattr(settings, 'POLLS_VOTE_BUFFER_ENABLED', False):
+        return None
+
+    if _vote_buffer is None:
+        with _vote_buffer_lock:
+            if _vote_buffer is None:
+                buffer = VoteBuffer(
+                    flush_interval=getattr(settings, 'POLLS_VOTE_BUFFER_FLUSH_INTERVAL', 200),
+                    max_votes=getattr(settings, 'POLLS_VOTE_BUFFER_MAX_VOTES', 1000),
+                )
+                buffer.start()
+                _vote_buffer = buffer
+    return _vote_buffer
@@ -0,0 +1,76 @@
+import gc
+import io
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from faker import Faker
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer
+from polls.management.benchmark import BenchmarkCommand, delete_rows
+from polls.models import Choice, Question
+from polls.serializers import QuestionListSerializer
+
+SLUG = 'benchmark-renderers'
+
+
+class Command(BenchmarkCommand):
+    help = 'Compare the JSON renderers and parsers on the QuestionListSerializer output of --questions questions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=10000)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded questions')
+
+    def handle(self, *args, **options):
+        user, _ = get_user_model().objects.get_or_create(
+            username='benchmark', defaults={'email': 'benchmark@example.com'})
+
+        try:
+            self.seed(user, options['questions'])
+            questions = Question.objects.filter(slug=SLUG).prefetch_related('choices').order_by('-pub_date')
+            data = QuestionListSerializer(questions, many=True).data
+
+            for label, renderer in (('JSONRenderer', JSONRenderer()), ('ORJSONRenderer', ORJSONRenderer())):
+                self.report('render with ' + label, [
+                    self.time(renderer.render, data) for _ in range(options['runs'])])
+
+            content = JSONRenderer().render(data)
+            self.stdout.write('Payload is {:.1f}kB'.format(len(content) / 1024))
+            for label, parser in (('JSONParser', JSONParser()), ('ORJSONParser', ORJSONParser())):
+                self.report('parse with ' + label, [
+                    self.time(parser.parse, io.BytesIO(content)) for _ in range(options['runs'])])
+
+            if ORJSONParser().parse(io.BytesIO(ORJSONRenderer().render(data))) != JSONParser().parse(
+                    io.BytesIO(content)):
+                self.stderr.write('The renderers disagree')
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+    def seed(self, user, count):
+        fake = Faker()
+        words = list({fake.first_name() for _ in range(2000)})
+        questions = Question.objects.bulk_create([
+            Question(question_text=' '.join(random.sample(words, 8)), slug=SLUG, created_by=user)
+            for _ in range(count)
+        ], batch_size=5000)
+        Choice.objects.bulk_create([
+            Choice(question=question, choice_text=' '.join(random.sample(words, 3)))
+            for question in questions for _ in range(3)
+        ], batch_size=5000)
+        self.stdout.write('Seeded {} questions'.format(count))
+
+    def cleanup(self):
+        questions = Question.objects.filter(slug=SLUG).values('pk')
+        delete_rows(Choice.objects.filter(question__in=questions), Question.objects.filter(slug=SLUG))
+
+    def time(self, function, argument):
+        # Collect the garbage of the previous run outside of the timing.
+        gc.collect()
+        started = time.perf_counter()
+        function(argument)
+        return (time.perf_counter() - started) * 1000
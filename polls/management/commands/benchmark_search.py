@@ -0,0 +1,74 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from faker import Faker
+
+from polls.management.benchmark import BenchmarkCommand, delete_rows
+from polls.models import Choice, Question
+
+SLUG = 'benchmark-search'
+
+
+class Command(BenchmarkCommand):
+    help = 'Compare full-text question search with an icontains scan over --questions seeded questions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=100000)
+        parser.add_argument('--searches', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded questions')
+
+    def handle(self, *args, **options):
+        fake = Faker()
+        # Lorem only has a couple hundred words, names give a larger vocabulary.
+        words = list({fake.first_name().lower() for _ in range(20000)})
+        user, _ = get_user_model().objects.get_or_create(
+            username='benchmark', defaults={'email': 'benchmark@example.com'})
+
+        try:
+            self.seed(user, words, options['questions'], options['batch_size'])
+            terms = random.sample(words, min(options['searches'], len(words)))
+
+            self.report('icontains', [self.time_search(self.icontains, term) for term in terms], 'searches')
+            if connection.vendor == 'postgresql':
+                self.report('full-text', [self.time_search(Question.objects.search, term) for term in terms],
+                            'searches')
+            else:
+                self.stdout.write('Full-text search needs PostgreSQL, skipping it')
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+    def seed(self, user, words, count, batch_size):
+        started = time.perf_counter()
+        for offset in range(0, count, batch_size):
+            questions = Question.objects.bulk_create([
+                Question(question_text=' '.join(random.sample(words, 8)), slug=SLUG, created_by=user)
+                for _ in range(min(batch_size, count - offset))
+            ])
+            Choice.objects.bulk_create([
+                Choice(question=question, choice_text=' '.join(random.sample(words, 3)))
+                for question in questions for _ in range(3)
+            ])
+            Question.objects.update_search_vectors([question.pk for question in questions])
+            self.stdout.write('Seeded {} questions'.format(offset + len(questions)))
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE {}'.format(Question._meta.db_table))
+                cursor.execute('ANALYZE {}'.format(Choice._meta.db_table))
+        self.stdout.write('Seeding took {:.1f}s'.format(time.perf_counter() - started))
+
+    def cleanup(self):
+        questions = Question.objects.filter(slug=SLUG).values('pk')
+        delete_rows(Choice.objects.filter(question__in=questions), Question.objects.filter(slug=SLUG))
+
+    def icontains(self, term):
+        return Question.objects.filter(question_text__icontains=term).order_by('-pub_date')
+
+    def time_search(self, search, term):
+        started = time.perf_counter()
+        list(search(term)[:20])
+        return (time.perf_counter() - started) * 1000
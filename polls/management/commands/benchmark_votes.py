@@ -0,0 +1,72 @@
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from polls.management.benchmark import BenchmarkCommand
+from polls.models import AlreadyVoted, Choice, Question, Vote
+
+
+class Command(BenchmarkCommand):
+    help = 'Measure vote latency against a vote ledger that already holds --ledger-rows votes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ledger-rows', type=int, default=1000000)
+        parser.add_argument('--votes', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=100000)
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark question and its votes')
+
+    def handle(self, *args, **options):
+        user, _ = get_user_model().objects.get_or_create(
+            username='benchmark', defaults={'email': 'benchmark@example.com'})
+        question = Question.objects.create(question_text='Benchmark question', slug='benchmark', created_by=user)
+        choices = Choice.objects.bulk_create(
+            [Choice(question=question, choice_text='Choice {}'.format(i)) for i in range(4)])
+
+        try:
+            self.seed(question, choices[0], options['ledger_rows'], options['batch_size'])
+
+            session_keys = [uuid.uuid4().hex for _ in range(options['votes'])]
+            self.report('new vote', [
+                self.time_vote(question, random.choice(choices), session_key) for session_key in session_keys
+            ], 'votes')
+            self.report('duplicate vote', [
+                self.time_vote(question, random.choice(choices), session_key) for session_key in session_keys
+            ], 'votes')
+        finally:
+            if not options['keep']:
+                question.delete()
+
+    def seed(self, question, choice, rows, batch_size):
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            size = min(batch_size, rows - offset)
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'INSERT INTO {} (question_id, choice_id, session_key, created_at) '
+                        "SELECT %s, %s, 'seed-' || n, now() FROM generate_series(%s, %s) AS n".format(
+                            Vote._meta.db_table),
+                        [question.id, choice.id, offset, offset + size - 1],
+                    )
+            else:
+                Vote.objects.bulk_create([
+                    Vote(question=question, choice=choice, session_key='seed-{}'.format(n))
+                    for n in range(offset, offset + size)
+                ])
+            self.stdout.write('Seeded {} ledger rows'.format(offset + size))
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE {}'.format(Vote._meta.db_table))
+        self.stdout.write('Seeding took {:.1f}s'.format(time.perf_counter() - started))
+
+    def time_vote(self, question, choice, session_key):
+        started = time.perf_counter()
+        try:
+            Choice.objects.vote(question.id, choice.id, session_key=session_key)
+        except AlreadyVoted:
+            pass
+        return (time.perf_counter() - started) * 1000
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from polls.models import Choice
+
+
+class Command(BaseCommand):
+    help = 'Fold sharded vote counters back into Choice.votes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--question', help='Only compact the choices of this question id')
+
+    def handle(self, *args, **options):
+        moved = Choice.objects.compact_shards(question_id=options['question'])
+        self.stdout.write(self.style.SUCCESS('Compacted {} votes'.format(moved)))
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from polls.models import Choice, Question
+from polls.pagination import QuestionCursorPagination
+
+
+class Command(BaseCommand):
+    help = 'Print the query plans of the main polls queries (EXPLAIN ANALYZE on PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username whose questions are listed, defaults to the busiest author')
+        parser.add_argument('--limit', type=int, default=20, help='Page size of the list queries')
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        user = self.get_user(options['user'])
+        question = Question.published.first() or Question.objects.first()
+
+        queries = [
+            ('Published questions', Question.published.order_by('-pub_date')[:limit]),
+            ('API page', Question.objects.order_by('-pub_date', '-id')[:limit]),
+        ]
+        if user is not None:
+            queries.append(("Author's questions", Question.objects.filter(created_by=user).order_by('-pub_date')[:limit]))
+        if question is not None:
+            paginator = QuestionCursorPagination()
+            position = paginator._get_position_from_instance(question, paginator.ordering)
+            cursor = paginator.get_position_filter(Question, position, reverse=False)
+            queries += [
+                ('API page after a cursor', Question.objects.filter(cursor).order_by(*paginator.ordering)[:limit]),
+                ('Choices of a question', Choice.objects.filter(question=question).order_by('created_at')),
+            ]
+
+        analyze = connection.vendor == 'postgresql'
+        for label, queryset in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(str(queryset.query))
+            plan = queryset.explain(analyze=True, buffers=True) if analyze else queryset.explain()
+            self.stdout.write(plan + '\n\n')
+
+    def get_user(self, username):
+        User = get_user_model()
+        if username is None:
+            author = Question.objects.values('created_by').order_by().annotate(
+                count=Count('id')).order_by('-count').values_list('created_by', flat=True).first()
+            return User.objects.filter(pk=author).first()
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError('User "{}" does not exist'.format(username))
@@ -0,0 +1,40 @@
+# Generated by Django 3.1 on 2026-10-18 19:17
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # GIN indexes and tsvectors only exist on PostgreSQL, other databases
+    # fall back to substring search.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX question_search_vector_idx ON polls_question USING gin (search_vector)')
+    schema_editor.execute(
+        "UPDATE polls_question SET search_vector = "
+        "setweight(to_tsvector('english', question_text), 'A') || "
+        "setweight(to_tsvector('english', coalesce("
+        "(SELECT string_agg(choice_text, ' ') FROM polls_choice WHERE question_id = polls_question.id), '')), 'B')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS question_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0007_question_published_and_author_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
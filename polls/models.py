@@ -1,14 +1,21 @@
 import datetime
+import random
 import uuid
 
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, SearchVectorField
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from taggit.managers import TaggableManager
 from taggit.models import GenericUUIDTaggedItemBase, TaggedItemBase
 
+from polls.buffer import get_vote_buffer
+
 
 class UUIDTaggedItem(GenericUUIDTaggedItemBase, TaggedItemBase):
     class Meta:
@@ -21,6 +28,144 @@ class PublishedManager(models.Manager):
         return super(PublishedManager, self).get_queryset().filter(status="published")
 
 
+class QuestionManager(models.Manager):
+    def update_search_vectors(self, question_ids=None):
+        """
+        Rebuild the search vector of the given questions, or of all of them,
+        from their text and the text of their choices. PostgreSQL only.
+        """
+        if connection.vendor != 'postgresql':
+            return 0
+
+        choices = Choice.objects.filter(question=OuterRef('pk')).order_by().values('question').annotate(
+            text=StringAgg('choice_text', ' ')).values('text')
+        questions = self.get_queryset()
+        if question_ids is not None:
+            questions = questions.filter(pk__in=question_ids)
+        return questions.update(search_vector=(
+            SearchVector('question_text', weight='A', config='english')
+            + SearchVector(Coalesce(Subquery(choices), Value('')), weight='B', config='english')
+        ))
+
+    def search(self, text):
+        """
+        Return the questions matching `text` in their own or their choices' text,
+        best matches first. Falls back to a plain substring match off PostgreSQL.
+        """
+        if connection.vendor != 'postgresql':
+            return self.get_queryset().filter(
+                Q(question_text__icontains=text) | Q(choices__choice_text__icontains=text)
+            ).distinct().order_by('-pub_date')
+
+        query = SearchQuery(text, search_type='websearch', config='english')
+        return self.get_queryset().filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)).order_by('-rank', '-pub_date')
+
+
+class AlreadyVoted(Exception):
+    pass
+
+
+class ChoiceManager(models.Manager):
+    def vote(self, question_id, choice_id, user=None, session_key=''):
+        """
+        Record a vote of a user (or an anonymous session) and add it to the
+        choice with a single database side increment so concurrent voters
+        never overwrite each other. The unique constraints of the Vote ledger
+        reject a second vote on the same question as part of the insert.
+
+        Questions with vote shards spread the increments over several counter
+        rows instead of the choice row, and with the vote buffer enabled the
+        increment is queued and written in bulk later. Returns the updated
+        tallies of the question or raises Choice.DoesNotExist or AlreadyVoted.
+        """
+        if user is None and not session_key:
+            raise ValueError('A vote needs a user or a session key')
+
+        # The canonical pk, as choice_id may be any spelling of the UUID.
+        row = self.filter(pk=choice_id, question_id=question_id).values_list('pk', 'question__vote_shards').first()
+        if row is None:
+            raise self.model.DoesNotExist
+        choice_id, shards = row
+
+        buffer = get_vote_buffer()
+        try:
+            with transaction.atomic():
+                Vote.objects.create(question_id=question_id, choice_id=choice_id, user=user,
+                                    session_key='' if user else session_key)
+                if buffer is None and shards:
+                    self._vote_on_shard(choice_id, random.randrange(shards))
+                elif buffer is None:
+                    self.filter(pk=choice_id).update(votes=F('votes') + 1)
+        except IntegrityError:
+            raise AlreadyVoted
+
+        if buffer is None:
+            return self.tallies(question_id, shards)
+
+        buffer.add(choice_id, question_id)
+        tallies = self.tallies(question_id, shards)
+        for pk, votes in buffer.pending(tallies).items():
+            tallies[pk] += votes
+        return tallies
+
+    def bulk_increment(self, increments):
+        """
+        Apply a {choice_id: votes} mapping with one UPDATE ... CASE statement.
+        """
+        whens = [When(pk=pk, then=F('votes') + votes) for pk, votes in increments.items()]
+        return self.filter(pk__in=list(increments)).update(votes=Case(*whens, output_field=models.IntegerField()))
+
+    def _vote_on_shard(self, choice_id, shard):
+        counters = ChoiceCounterShard.objects.filter(choice_id=choice_id, shard=shard)
+        if counters.update(count=F('count') + 1):
+            return
+
+        try:
+            with transaction.atomic():
+                ChoiceCounterShard.objects.create(choice_id=choice_id, shard=shard, count=1)
+        except IntegrityError:
+            # Another voter created the shard first.
+            counters.update(count=F('count') + 1)
+
+    def tallies(self, question_id, shards=0):
+        """
+        Return {choice id: votes} of a question, summing its vote shards.
+        """
+        if not shards:
+            return dict(self.filter(question_id=question_id).values_list('id', 'votes'))
+
+        return dict(
+            self.filter(question_id=question_id)
+            .annotate(total=F('votes') + Coalesce(Sum('shards__count'), 0))
+            .values_list('id', 'total')
+        )
+
+    def compact_shards(self, question_id=None):
+        """
+        Fold the counter shards back into Choice.votes so it holds the
+        authoritative total. Returns the number of votes moved.
+        """
+        pending = ChoiceCounterShard.objects.exclude(count=0)
+        if question_id:
+            pending = pending.filter(choice__question_id=question_id)
+
+        moved = 0
+        for choice_id in pending.values_list('choice_id', flat=True).distinct():
+            with transaction.atomic():
+                counters = dict(
+                    ChoiceCounterShard.objects.select_for_update()
+                    .filter(choice_id=choice_id)
+                    .exclude(count=0)
+                    .values_list('pk', 'count')
+                )
+                total = sum(counters.values())
+                self.filter(pk=choice_id).update(votes=F('votes') + total)
+                ChoiceCounterShard.objects.filter(pk__in=counters).update(count=0)
+            moved += total
+        return moved
+
+
 class Question(models.Model):
     STATUS_CHOICES = (
         ("draft", "Draft"),
@@ -34,15 +179,25 @@ class Question(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="draft")
+    vote_shards = models.PositiveSmallIntegerField(
+        default=0, help_text='Spread votes over this many counter rows per choice. Use 0 for regular polls.')
+    # Kept up to date by polls.signals on PostgreSQL, see QuestionManager.update_search_vectors.
+    search_vector = SearchVectorField(null=True, editable=False)
 
-    created_by = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    # Indexed by question_author_pub_date_idx, which leads with created_by.
+    created_by = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, db_index=False)
 
-    objects = models.Manager()
+    objects = QuestionManager()
     published = PublishedManager()
     tags = TaggableManager(through=UUIDTaggedItem)
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'], name='question_pub_date_id_idx'),
+            models.Index(fields=['-pub_date'], name='question_published_idx', condition=models.Q(status='published')),
+            models.Index(fields=['created_by', '-pub_date'], name='question_author_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.question_text
@@ -59,6 +214,12 @@ class Question(models.Model):
     def get_delete_url(self):
         return reverse('polls:question_delete', args=[self.id])
 
+    def get_vote_url(self):
+        return reverse('polls:vote', args=[self.id])
+
+    def get_results_url(self):
+        return reverse('polls:results', args=[self.id])
+
     def can_update(self, user):
         return user.is_superuser or self.created_by == user
 
@@ -74,8 +235,45 @@ class Choice(models.Model):
 
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='choices')
 
+    objects = ChoiceManager()
+
     def __str__(self):
         return self.choice_text
 
     def get_absolute_url(self):
         return reverse('choice_detail', args=str([self.id]))
+
+
+class ChoiceCounterShard(models.Model):
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, related_name='shards')
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['choice', 'shard'], name='unique_choice_shard'),
+        ]
+
+    def __str__(self):
+        return '{} #{}'.format(self.choice, self.shard)
+
+
+class Vote(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='ballots')
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, related_name='ballots')
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, null=True, blank=True,
+                             related_name='votes')
+    session_key = models.CharField(max_length=40, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'user'], condition=models.Q(user__isnull=False),
+                                    name='unique_user_vote'),
+            models.UniqueConstraint(fields=['question', 'session_key'], condition=models.Q(user__isnull=True),
+                                    name='unique_session_vote'),
+        ]
+
+    def __str__(self):
+        return '{}: {}'.format(self.user or self.session_key, self.choice)
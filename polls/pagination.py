@@ -0,0 +1,112 @@
+import json
+
+from api.pagination import SettingsPageSizeMixin
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+
+
+class QuestionCursorPagination(SettingsPageSizeMixin, CursorPagination):
+    """
+    Keyset pagination over (pub_date, id).
+
+    DRF's cursor only remembers the first ordering field and steps over
+    rows sharing it with an offset. This cursor keeps the whole key of the
+    last row instead, so every page is a single index range scan however
+    deep it is, and questions published in the meantime never shift it.
+    """
+    ordering = ('-pub_date', '-id')
+    page_size_setting = 'POLLS_API_PAGE_SIZE'
+    max_page_size_setting = 'POLLS_API_MAX_PAGE_SIZE'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor is not None else None
+
+        if reverse:
+            queryset = queryset.order_by(*[flip(field) for field in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(queryset.model, position, reverse))
+
+        # Fetch one extra row to find out whether another page follows.
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.next_position = self.previous_position = position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_position_filter(self, model, position, reverse):
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # (a, b) < (x, y) is spelled out as a < x OR (a = x AND b < y). The
+        # redundant a <= x in front gives the planner a bound for the index scan.
+        condition, equal = Q(), {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            condition |= Q(**equal, **{'{}__{}'.format(name, lookup): value})
+            equal[name] = value
+        first = self.ordering[0]
+        bound = 'lte' if first.startswith('-') != reverse else 'gte'
+        return Q(**{'{}__{}'.format(first.lstrip('-'), bound): values[0]}) & condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else self.next_position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page else self.previous_position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        fields = [field.lstrip('-') for field in ordering]
+        if isinstance(instance, dict):
+            values = [instance[field] for field in fields]
+        else:
+            values = [getattr(instance, field) for field in fields]
+        return json.dumps([value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in values])
+
+
+class QuestionSearchPagination(SettingsPageSizeMixin, PageNumberPagination):
+    """
+    Search results are ordered by rank, which has no stable key to page on.
+    """
+    page_size_setting = 'POLLS_API_PAGE_SIZE'
+    max_page_size_setting = 'POLLS_API_MAX_PAGE_SIZE'
+
+
+def flip(field):
+    return field[1:] if field.startswith('-') else '-' + field
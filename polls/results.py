@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+
+from polls.models import Choice, Question
+
+logger = logging.getLogger(__name__)
+
+
+class ResultsCacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.last_rebuild_ms = 0.0
+        self.max_rebuild_ms = 0.0
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self, rebuild_ms):
+        with self._lock:
+            self.misses += 1
+            self.last_rebuild_ms = rebuild_ms
+            self.max_rebuild_ms = max(self.max_rebuild_ms, rebuild_ms)
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'last_rebuild_ms': round(self.last_rebuild_ms, 3),
+            'max_rebuild_ms': round(self.max_rebuild_ms, 3),
+        }
+
+
+stats = ResultsCacheStats()
+
+
+def results_cache_key(question_id):
+    return 'polls:results:{}'.format(question_id)
+
+
+def build_results(question_text, choices):
+    """
+    Build a results snapshot from the question text and a list of
+    (id, choice_text, votes) tuples.
+    """
+    total = sum(votes for _, _, votes in choices)
+    leader = max(choices, key=lambda choice: choice[2], default=None)
+    return {
+        'question_text': question_text,
+        'total': total,
+        'leader': str(leader[0]) if leader and leader[2] else None,
+        'choices': [
+            {
+                'id': str(pk),
+                'choice_text': choice_text,
+                'votes': votes,
+                'percent': round(100 * votes / total, 1) if total else 0.0,
+            }
+            for pk, choice_text, votes in choices
+        ],
+    }
+
+
+def load_results(question_id):
+    """
+    Build the results snapshot of a question from the database.
+    Raises Question.DoesNotExist.
+    """
+    question = Question.objects.values('question_text', 'vote_shards').get(pk=question_id)
+    choices = Choice.objects.filter(question_id=question_id).order_by('created_at')
+    if question['vote_shards']:
+        choices = choices.annotate(votes_total=F('votes') + Coalesce(Sum('shards__count'), 0))
+    else:
+        choices = choices.annotate(votes_total=F('votes'))
+    return build_results(question['question_text'], list(choices.values_list('id', 'choice_text', 'votes_total')))
+
+
+def get_results(question_id):
+    """
+    Return the results snapshot of a question from the cache, rebuilding it
+    on a miss. Raises Question.DoesNotExist.
+    """
+    key = results_cache_key(question_id)
+    results = cache.get(key)
+    if results is not None:
+        stats.hit()
+        return results
+
+    started = time.perf_counter()
+    results = load_results(question_id)
+    cache.set(key, results, getattr(settings, 'POLLS_RESULTS_CACHE_TIMEOUT', 300))
+
+    rebuild_ms = (time.perf_counter() - started) * 1000
+    stats.miss(rebuild_ms)
+    logger.debug('Rebuilt results of %s in %.1fms', question_id, rebuild_ms)
+    return results
+
+
+def update_results(question_id, tallies):
+    """
+    Refresh the counts of a cached snapshot with tallies that were just read
+    from the database. Snapshots that are not cached are left to the next read.
+
+    Votes only ever add up, so each choice keeps the larger of its cached and
+    new count. Updates never wait for each other: a vote that finds another
+    vote updating the snapshot drops it instead, so the next read rebuilds
+    it. A vote whose tallies were read before another's can then never roll
+    the snapshot back.
+    """
+    key = results_cache_key(question_id)
+    lock = '{}:lock'.format(key)
+    if not cache.add(lock, 1, 5):
+        cache.delete(key)
+        return
+
+    try:
+        results = cache.get(key)
+        if results is None:
+            return
+
+        votes = {str(pk): count for pk, count in tallies.items()}
+        if set(votes) != {choice['id'] for choice in results['choices']}:
+            cache.delete(key)
+            return
+
+        choices = [
+            (choice['id'], choice['choice_text'], max(votes[choice['id']], choice['votes']))
+            for choice in results['choices']
+        ]
+        cache.set(key, build_results(results['question_text'], choices),
+                  getattr(settings, 'POLLS_RESULTS_CACHE_TIMEOUT', 300))
+    finally:
+        cache.delete(lock)
+
+
+def invalidate_results(*question_ids):
+    cache.delete_many([results_cache_key(question_id) for question_id in question_ids])
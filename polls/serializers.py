@@ -1,3 +1,4 @@
+from api.serializers import ValuesSerializer
 from rest_framework import serializers
 from users.serializers import UserSerializer
 
@@ -18,6 +19,20 @@ class QuestionListSerializer(serializers.ModelSerializer):
         fields = ('id', 'question_text', 'pub_date', 'choices',)
 
 
+class QuestionListValues(ValuesSerializer):
+    serializer_class = QuestionListSerializer
+
+    def add_related(self, rows):
+        # Choices are listed by their __str__, which is the choice text, in
+        # the order the database returns them as with prefetch_related().
+        choices = {row['id']: [] for row in rows}
+        for question_id, text in Choice.objects.filter(question_id__in=choices).values_list(
+                'question_id', 'choice_text'):
+            choices[question_id].append(text)
+        for row in rows:
+            row['choices'] = choices[row['id']]
+
+
 class QuestionDetailSerializer(serializers.ModelSerializer):
     choices = serializers.StringRelatedField(many=True)
     created_by = UserSerializer()
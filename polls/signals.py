@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from polls.models import Choice, Question
+from polls.results import invalidate_results
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_results(sender, instance, **kwargs):
+    invalidate_results(instance.pk)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def invalidate_choice_results(sender, instance, **kwargs):
+    invalidate_results(instance.question_id)
+
+
+@receiver(post_save, sender=Question)
+def update_question_search_vector(sender, instance, **kwargs):
+    Question.objects.update_search_vectors([instance.pk])
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def update_choice_search_vector(sender, instance, **kwargs):
+    Question.objects.update_search_vectors([instance.question_id])
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def touch_choice_question(sender, instance, raw=False, **kwargs):
+    # Pages and API responses of a question are validated by its updated_at.
+    if not raw:
+        Question.objects.filter(pk=instance.question_id).update(updated_at=timezone.now())
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+import re
+import uuid
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from polls.models import Question
+from polls.results import load_results
+
+logger = logging.getLogger(__name__)
+
+RESULTS_STREAM_PATH = re.compile(
+    r'^/polls/(?P<pk>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})/results/stream/$')
+
+
+class ResultsBroadcaster:
+    """
+    Fans out the results of a question to every subscriber in this process.
+    One watcher per question reads the results at most every `interval`
+    milliseconds and only publishes them when they changed. Each subscriber
+    holds at most one pending snapshot, so slow clients get the latest
+    results instead of a backlog.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval
+        self._subscribers = defaultdict(set)
+        self._watchers = {}
+        self._latest = {}
+
+    def get_interval(self):
+        interval = self.interval or getattr(settings, 'POLLS_RESULTS_STREAM_INTERVAL', 1000)
+        return interval / 1000
+
+    def subscribe(self, question_id):
+        queue = asyncio.Queue(maxsize=1)
+        self._subscribers[question_id].add(queue)
+        if question_id in self._latest:
+            queue.put_nowait(self._latest[question_id])
+        if question_id not in self._watchers:
+            self._watchers[question_id] = asyncio.ensure_future(self._watch(question_id))
+        return queue
+
+    def unsubscribe(self, question_id, queue):
+        subscribers = self._subscribers.get(question_id, set())
+        subscribers.discard(queue)
+        if not subscribers:
+            self._subscribers.pop(question_id, None)
+            self._latest.pop(question_id, None)
+            watcher = self._watchers.pop(question_id, None)
+            if watcher is not None:
+                watcher.cancel()
+
+    def subscriber_count(self, question_id=None):
+        if question_id is not None:
+            return len(self._subscribers.get(question_id, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, question_id, results):
+        self._latest[question_id] = results
+        for queue in self._subscribers.get(question_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(results)
+
+    async def _watch(self, question_id):
+        latest = None
+        while True:
+            try:
+                results = await sync_to_async(read_results, thread_sensitive=True)(question_id)
+            except Question.DoesNotExist:
+                self.publish(question_id, None)
+                return
+            except Exception:
+                logger.exception('Could not load results of %s', question_id)
+            else:
+                if results != latest:
+                    latest = results
+                    self.publish(question_id, results)
+            await asyncio.sleep(self.get_interval())
+
+
+broadcaster = ResultsBroadcaster()
+
+
+# Database reads run on the one thread shared by thread sensitive calls, so
+# a worker keeps a single connection for every stream it serves. They happen
+# outside of the request cycle, so nothing else recycles that connection.
+
+def read_results(question_id):
+    try:
+        return load_results(question_id)
+    finally:
+        close_old_connections()
+
+
+def question_exists(question_id):
+    try:
+        return Question.objects.filter(pk=question_id).exists()
+    finally:
+        close_old_connections()
+
+
+def encode_event(event, data):
+    return 'event: {}\ndata: {}\n\n'.format(event, json.dumps(data)).encode()
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def results_stream(scope, receive, send):
+    """
+    ASGI application streaming the results of a question as Server-Sent Events.
+    """
+    question_id = uuid.UUID(RESULTS_STREAM_PATH.match(scope['path']).group('pk'))
+
+    exists = await sync_to_async(question_exists, thread_sensitive=True)(question_id)
+    if not exists:
+        await send({'type': 'http.response.start', 'status': 404, 'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Not Found'})
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+
+    keepalive = getattr(settings, 'POLLS_RESULTS_STREAM_KEEPALIVE', 15)
+    queue = broadcaster.subscribe(question_id)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        while True:
+            update = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({update, disconnect}, timeout=keepalive,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                update.cancel()
+                return
+            if update not in done:
+                update.cancel()
+                await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+                continue
+
+            results = update.result()
+            if results is None:
+                await send({'type': 'http.response.body', 'body': encode_event('closed', {})})
+                return
+            await send({'type': 'http.response.body', 'body': encode_event('results', results), 'more_body': True})
+    finally:
+        disconnect.cancel()
+        broadcaster.unsubscribe(question_id, queue)
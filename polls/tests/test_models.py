@@ -1,9 +1,19 @@
+import threading
+import uuid
+from io import StringIO
+from unittest import mock, skipIf
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
+from polls.buffer import VoteBuffer
 from polls.factories import ChoiceFactory, QuestionFactory, UserFactory
-from polls.models import Choice, Question
+from polls.models import AlreadyVoted, Choice, ChoiceCounterShard, Question, Vote
+from polls.results import get_results
 
 
 class ModelTests(TestCase):
@@ -33,6 +43,18 @@ class QuestionModelTests(TestCase):
         self.assertEqual(self.question.created_by, self.user)
         self.assertEqual(str(self.question), 'test_question')
 
+    def test_published_manager_only_returns_published_questions(self):
+        published = Question.objects.create(
+            question_text='published_question', status='published', created_by=self.user)
+        self.assertEqual(list(Question.published.all()), [published])
+
+    def test_explain_polls_prints_a_plan_per_query(self):
+        out = StringIO()
+        call_command('explain_polls', user='testuser', stdout=out)
+
+        for label in ('Published questions', 'API page', "Author's questions", 'Choices of a question'):
+            self.assertIn(label, out.getvalue())
+
 
 class ChoiceModelTests(TestCase):
     def setUp(self):
@@ -56,3 +78,203 @@ class ChoiceModelTests(TestCase):
     def test_choice_listing(self):
         self.assertEqual(f'{self.choice.choice_text}', 'test_choice')
         self.assertEqual(self.choice.question, self.question)
+
+
+class VoteLedgerTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.question = QuestionFactory()
+        self.choice_1 = ChoiceFactory(question=self.question, votes=0)
+        self.choice_2 = ChoiceFactory(question=self.question, votes=0)
+
+    def test_vote_is_recorded_in_the_ledger(self):
+        tallies = Choice.objects.vote(self.question.id, self.choice_1.id, user=self.user)
+
+        vote = Vote.objects.get()
+        self.assertEqual(vote.user, self.user)
+        self.assertEqual(vote.choice, self.choice_1)
+        self.assertEqual(vote.question, self.question)
+        self.assertEqual(tallies[self.choice_1.id], 1)
+
+    def test_user_can_vote_only_once_per_question(self):
+        Choice.objects.vote(self.question.id, self.choice_1.id, user=self.user)
+
+        with self.assertRaises(AlreadyVoted):
+            Choice.objects.vote(self.question.id, self.choice_2.id, user=self.user)
+
+        self.choice_2.refresh_from_db()
+        self.assertEqual(self.choice_2.votes, 0)
+        self.assertEqual(Vote.objects.count(), 1)
+
+    def test_session_can_vote_only_once_per_question(self):
+        Choice.objects.vote(self.question.id, self.choice_1.id, session_key='abc')
+
+        with self.assertRaises(AlreadyVoted):
+            Choice.objects.vote(self.question.id, self.choice_1.id, session_key='abc')
+
+        self.choice_1.refresh_from_db()
+        self.assertEqual(self.choice_1.votes, 1)
+
+    def test_duplicate_check_does_not_need_a_lookup(self):
+        Choice.objects.vote(self.question.id, self.choice_1.id, user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertRaises(AlreadyVoted):
+                Choice.objects.vote(self.question.id, self.choice_1.id, user=self.user)
+
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 1)
+        self.assertNotIn('polls_vote', selects[0])
+
+    def test_user_can_vote_on_different_questions(self):
+        other_choice = ChoiceFactory(votes=0)
+
+        Choice.objects.vote(self.question.id, self.choice_1.id, user=self.user)
+        Choice.objects.vote(other_choice.question_id, other_choice.id, user=self.user)
+
+        self.assertEqual(Vote.objects.filter(user=self.user).count(), 2)
+
+    def test_vote_needs_a_voter(self):
+        with self.assertRaises(ValueError):
+            Choice.objects.vote(self.question.id, self.choice_1.id)
+
+
+class ShardedVoteTests(TestCase):
+    def setUp(self):
+        self.question = QuestionFactory(vote_shards=4)
+        self.choice = ChoiceFactory(question=self.question, votes=5)
+        self.other_choice = ChoiceFactory(question=self.question, votes=0)
+
+    def vote(self, times):
+        for _ in range(times):
+            Choice.objects.vote(self.question.id, self.choice.id, session_key=uuid.uuid4().hex)
+
+    def test_votes_land_on_shards_not_on_the_choice_row(self):
+        self.vote(40)
+
+        self.choice.refresh_from_db()
+        self.assertEqual(self.choice.votes, 5)
+        self.assertLessEqual(ChoiceCounterShard.objects.filter(choice=self.choice).count(), 4)
+        self.assertEqual(sum(ChoiceCounterShard.objects.values_list('count', flat=True)), 40)
+
+    def test_tallies_sum_the_shards(self):
+        self.vote(10)
+
+        tallies = Choice.objects.tallies(self.question.id, self.question.vote_shards)
+        self.assertEqual(tallies, {self.choice.id: 15, self.other_choice.id: 0})
+
+    def test_every_vote_returns_tallies_with_that_vote(self):
+        for expected in (6, 7, 8):
+            tallies = Choice.objects.vote(self.question.id, self.choice.id, session_key=uuid.uuid4().hex)
+            self.assertEqual(tallies[self.choice.id], expected)
+
+    def test_compaction_moves_shards_into_choice_votes(self):
+        self.vote(10)
+
+        call_command('compact_vote_shards', stdout=StringIO())
+
+        self.choice.refresh_from_db()
+        self.assertEqual(self.choice.votes, 15)
+        self.assertFalse(ChoiceCounterShard.objects.exclude(count=0).exists())
+
+    def test_vote_for_choice_of_another_question_raises(self):
+        with self.assertRaises(Choice.DoesNotExist):
+            Choice.objects.vote(self.question.id, ChoiceFactory().id, session_key='session')
+        self.assertFalse(ChoiceCounterShard.objects.exists())
+
+
+class VoteBufferTests(TestCase):
+    def setUp(self):
+        self.buffer = VoteBuffer(flush_interval=0, max_votes=10)
+        self.question = QuestionFactory()
+        self.choice_1 = ChoiceFactory(question=self.question, votes=0)
+        self.choice_2 = ChoiceFactory(question=self.question, votes=0)
+
+    def vote(self, choice, times):
+        with mock.patch('polls.models.get_vote_buffer', return_value=self.buffer):
+            for _ in range(times):
+                tallies = Choice.objects.vote(self.question.id, choice.id, session_key=uuid.uuid4().hex)
+        return tallies
+
+    def test_buffered_votes_are_counted_in_tallies_before_the_flush(self):
+        self.vote(self.choice_1, 3)
+        tallies = self.vote(self.choice_2, 2)
+
+        self.choice_1.refresh_from_db()
+        self.assertEqual(self.choice_1.votes, 0)
+        self.assertEqual(tallies, {self.choice_1.id: 3, self.choice_2.id: 2})
+        self.assertEqual(self.buffer.stats()['depth'], 5)
+
+    def test_flush_writes_all_choices_in_one_statement(self):
+        self.vote(self.choice_1, 3)
+        self.vote(self.choice_2, 2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.buffer.flush(), 5)
+
+        self.choice_1.refresh_from_db()
+        self.choice_2.refresh_from_db()
+        self.assertEqual(self.choice_1.votes, 3)
+        self.assertEqual(self.choice_2.votes, 2)
+
+        stats = self.buffer.stats()
+        self.assertEqual(stats['depth'], 0)
+        self.assertEqual(stats['flushes'], 1)
+        self.assertEqual(stats['flushed_votes'], 5)
+
+    def test_buffer_flushes_when_full(self):
+        self.vote(self.choice_1, 12)
+
+        self.choice_1.refresh_from_db()
+        self.assertEqual(self.choice_1.votes, 10)
+        self.assertEqual(self.buffer.stats()['depth'], 2)
+
+    def test_flush_invalidates_results(self):
+        get_results(self.question.id)
+        self.vote(self.choice_1, 2)
+        self.buffer.flush()
+
+        self.assertEqual(get_results(self.question.id)['total'], 2)
+
+    def test_stop_flushes_pending_votes(self):
+        self.vote(self.choice_1, 4)
+        self.buffer.stop()
+
+        self.choice_1.refresh_from_db()
+        self.assertEqual(self.choice_1.votes, 4)
+
+
+@skipIf(connection.vendor == 'sqlite', 'SQLite test databases do not allow concurrent writers')
+class VoteConcurrencyTests(TransactionTestCase):
+    threads = 16
+    votes_per_thread = 50
+    vote_shards = 0
+
+    def test_concurrent_votes_on_one_choice_are_not_lost(self):
+        choice = ChoiceFactory(votes=0, question=QuestionFactory(vote_shards=self.vote_shards))
+        question_id = choice.question_id
+        errors = []
+
+        def hammer():
+            try:
+                for _ in range(self.votes_per_thread):
+                    Choice.objects.vote(question_id, choice.id, session_key=uuid.uuid4().hex)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=hammer) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        Choice.objects.compact_shards()
+        choice.refresh_from_db()
+        self.assertEqual(errors, [])
+        self.assertEqual(choice.votes, self.threads * self.votes_per_thread)
+
+
+class ShardedVoteConcurrencyTests(VoteConcurrencyTests):
+    vote_shards = 8
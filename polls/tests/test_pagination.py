@@ -0,0 +1,73 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from polls.models import Question
+
+
+@override_settings(POLLS_API_PAGE_SIZE=3, POLLS_API_MAX_PAGE_SIZE=5)
+class QuestionCursorPaginationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@email.com',
+            password='testpass123'
+        )
+        self.now = timezone.now()
+        # Pairs of questions share a pub_date so the id has to break the tie.
+        self.questions = [
+            Question.objects.create(
+                question_text='Question {}'.format(i),
+                slug='question-{}'.format(i),
+                pub_date=self.now - datetime.timedelta(minutes=i // 2),
+                created_by=self.user,
+            )
+            for i in range(8)
+        ]
+        self.expected = [
+            str(question.id) for question in sorted(
+                self.questions, key=lambda question: (question.pub_date, question.id), reverse=True)
+        ]
+
+    def walk(self, url, direction='next'):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = [question['id'] for question in response.json()['results']]
+            ids = ids + page if direction == 'next' else page + ids
+            url = response.json()[direction]
+        return ids
+
+    def test_pages_follow_pub_date_and_id(self):
+        self.assertEqual(self.walk('/api/v1/polls/'), self.expected)
+
+    def test_previous_links_walk_back_to_the_first_page(self):
+        url = '/api/v1/polls/'
+        while True:
+            response = self.client.get(url)
+            if response.json()['next'] is None:
+                break
+            url = response.json()['next']
+
+        ids = self.walk(response.json()['previous'], direction='previous')
+        self.assertEqual(ids + [question['id'] for question in response.json()['results']], self.expected)
+
+    def test_new_questions_do_not_shift_later_pages(self):
+        first = self.client.get('/api/v1/polls/').json()
+        Question.objects.create(
+            question_text='Breaking news', slug='breaking-news', pub_date=self.now + datetime.timedelta(minutes=1),
+            created_by=self.user)
+
+        ids = [question['id'] for question in first['results']] + self.walk(first['next'])
+        self.assertEqual(ids, self.expected)
+
+    def test_page_size_is_capped(self):
+        response = self.client.get('/api/v1/polls/', {'page_size': 50})
+        self.assertEqual(len(response.json()['results']), 5)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get('/api/v1/polls/', {'cursor': 'cD1ub3Rqc29u'})
+        self.assertEqual(response.status_code, 404)
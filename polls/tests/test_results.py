@@ -0,0 +1,115 @@
+import uuid
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from polls.factories import ChoiceFactory, QuestionFactory
+from polls.models import Choice, Question
+from polls.results import get_results, invalidate_results, stats, update_results
+
+
+class ResultsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.question = QuestionFactory()
+        self.choice_1 = ChoiceFactory(question=self.question, votes=3)
+        self.choice_2 = ChoiceFactory(question=self.question, votes=1)
+
+    def test_results_snapshot(self):
+        results = get_results(self.question.id)
+
+        self.assertEqual(results['question_text'], self.question.question_text)
+        self.assertEqual(results['total'], 4)
+        self.assertEqual(results['leader'], str(self.choice_1.id))
+        self.assertEqual(results['choices'][0], {
+            'id': str(self.choice_1.id),
+            'choice_text': self.choice_1.choice_text,
+            'votes': 3,
+            'percent': 75.0,
+        })
+        self.assertEqual(results['choices'][1]['percent'], 25.0)
+
+    def test_cached_results_need_no_queries(self):
+        get_results(self.question.id)
+        hits = stats.hits
+
+        with self.assertNumQueries(0):
+            get_results(self.question.id)
+        self.assertEqual(stats.hits, hits + 1)
+
+    def test_results_without_votes_have_no_leader(self):
+        question = QuestionFactory()
+        ChoiceFactory(question=question, votes=0)
+
+        results = get_results(question.id)
+        self.assertIsNone(results['leader'])
+        self.assertEqual(results['choices'][0]['percent'], 0.0)
+
+    def test_vote_refreshes_the_cached_snapshot(self):
+        get_results(self.question.id)
+
+        tallies = Choice.objects.vote(self.question.id, self.choice_2.id, session_key=uuid.uuid4().hex)
+        update_results(self.question.id, tallies)
+
+        with self.assertNumQueries(0):
+            results = get_results(self.question.id)
+        self.assertEqual(results['total'], 5)
+        self.assertEqual(results['choices'][1]['votes'], 2)
+
+    def test_older_tallies_never_roll_the_snapshot_back(self):
+        get_results(self.question.id)
+        update_results(self.question.id, {self.choice_1.id: 5, self.choice_2.id: 1})
+        update_results(self.question.id, {self.choice_1.id: 4, self.choice_2.id: 2})
+
+        results = get_results(self.question.id)
+        self.assertEqual([choice['votes'] for choice in results['choices']], [5, 2])
+
+    def test_snapshot_is_dropped_without_waiting_when_another_update_holds_the_lock(self):
+        get_results(self.question.id)
+        cache.set('polls:results:{}:lock'.format(self.question.id), 1)
+
+        with mock.patch('polls.results.time.sleep') as sleep:
+            update_results(self.question.id, {self.choice_1.id: 4, self.choice_2.id: 1})
+
+        sleep.assert_not_called()
+
+        self.assertIsNone(cache.get('polls:results:{}'.format(self.question.id)))
+
+    def test_votes_on_a_sharded_question_keep_the_snapshot_right(self):
+        question = QuestionFactory(vote_shards=4)
+        choice = ChoiceFactory(question=question, votes=0)
+        get_results(question.id)
+
+        for votes in (1, 2, 3):
+            # A new session for every anonymous voter.
+            self.client.cookies.clear()
+            response = self.client.post(question.get_vote_url(), {'choice': choice.id}, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.json()['total'], votes)
+
+        self.assertEqual(get_results(question.id)['total'], 3)
+
+    def test_buffered_votes_drop_the_snapshot(self):
+        get_results(self.question.id)
+        with mock.patch('polls.views.get_vote_buffer', return_value=mock.Mock()), \
+                mock.patch('polls.views.Choice.objects.vote', return_value={self.choice_1.id: 3, self.choice_2.id: 2}):
+            self.client.post(self.question.get_vote_url(), {'choice': self.choice_2.id})
+
+        self.assertIsNone(cache.get('polls:results:{}'.format(self.question.id)))
+
+    def test_editing_choices_invalidates_the_snapshot(self):
+        get_results(self.question.id)
+        ChoiceFactory(question=self.question, votes=0)
+
+        self.assertEqual(len(get_results(self.question.id)['choices']), 3)
+
+    def test_invalidate_results(self):
+        get_results(self.question.id)
+        Choice.objects.filter(pk=self.choice_1.pk).update(votes=10)
+        invalidate_results(self.question.id)
+
+        self.assertEqual(get_results(self.question.id)['total'], 11)
+
+    def test_missing_question_raises(self):
+        with self.assertRaises(Question.DoesNotExist):
+            get_results(uuid.uuid4())
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import uuid
+from unittest import mock
+
+from asgiref.sync import SyncToAsync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+
+from main.asgi import application
+from polls.factories import ChoiceFactory, QuestionFactory
+from polls.models import Choice
+from polls.streams import broadcaster, read_results
+
+
+def stream_scope(question_id):
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': '/polls/{}/results/stream/'.format(question_id),
+        'query_string': b'',
+        'headers': [],
+    }
+
+
+def parse_event(message):
+    event, data = message['body'].decode().strip().split('\n')
+    return event[len('event: '):], json.loads(data[len('data: '):])
+
+
+@override_settings(POLLS_RESULTS_STREAM_INTERVAL=20)
+class ResultsStreamTests(TransactionTestCase):
+    def setUp(self):
+        self.question = QuestionFactory()
+        self.choice = ChoiceFactory(question=self.question, votes=2)
+
+    def tearDown(self):
+        # Watchers keep their connection open on asgiref's shared thread.
+        SyncToAsync.single_thread_executor.submit(connections.close_all).result()
+
+    async def connect(self):
+        communicator = ApplicationCommunicator(application, stream_scope(self.question.id))
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+        start = await communicator.receive_output(timeout=2)
+        return communicator, start
+
+    async def disconnect(self, communicator):
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(timeout=2)
+
+    async def test_stream_pushes_results_when_votes_arrive(self):
+        communicator, start = await self.connect()
+
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+
+        event, results = parse_event(await communicator.receive_output(timeout=2))
+        self.assertEqual(event, 'results')
+        self.assertEqual(results['total'], 2)
+
+        await sync_to_async(Choice.objects.vote, thread_sensitive=True)(
+            self.question.id, self.choice.id, session_key=uuid.uuid4().hex)
+
+        event, results = parse_event(await communicator.receive_output(timeout=2))
+        self.assertEqual(results['total'], 3)
+
+        await self.disconnect(communicator)
+        self.assertEqual(broadcaster.subscriber_count(), 0)
+
+    async def test_subscribers_share_one_watcher(self):
+        with mock.patch('polls.streams.read_results', wraps=read_results) as loader:
+            first, _ = await self.connect()
+            second, _ = await self.connect()
+
+            await first.receive_output(timeout=2)
+            await second.receive_output(timeout=2)
+            self.assertEqual(broadcaster.subscriber_count(self.question.id), 2)
+
+            await asyncio.sleep(0.1)
+            await self.disconnect(first)
+            await self.disconnect(second)
+
+        # One watcher polling every 20ms, not one per client.
+        self.assertLess(loader.call_count, 10)
+        self.assertEqual(broadcaster.subscriber_count(), 0)
+
+    async def test_stream_for_missing_question_returns_404(self):
+        communicator = ApplicationCommunicator(application, stream_scope(uuid.uuid4()))
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+
+        start = await communicator.receive_output(timeout=2)
+        self.assertEqual(start['status'], 404)
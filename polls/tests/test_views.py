@@ -1,11 +1,20 @@
+import uuid
+from unittest import mock, skipIf
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.messages import get_messages
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.urls import resolve, reverse
 from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
 
-from polls.models import Question
+from polls.buffer import VoteBuffer
+from polls.factories import ChoiceFactory
+from polls.models import Choice, Question
+from polls.serializers import QuestionListSerializer, QuestionListValues
 from polls.views import (QuestionCreate, QuestionDelete, QuestionDetailView,
-                         QuestionListView, QuestionUpdate)
+                         QuestionListView, QuestionUpdate, VoteView)
 
 
 class QuestionListTests(TestCase):
@@ -97,6 +106,57 @@ class QuestionDetailTests(TestCase):
         self.assertEqual(view.func.__name__, QuestionDetailView.as_view().__name__)
 
 
+class QuestionConditionalTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', email='testuser@email.com')
+        self.question = Question.objects.create(question_text='When will I go to India?', created_by=self.user)
+        ChoiceFactory(question=self.question)
+
+    def test_unchanged_page_is_not_modified(self):
+        url = self.question.get_absolute_url()
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        # Only the validators are read, the page is not rendered.
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+        since = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+    def test_page_changes_with_its_choices_and_user(self):
+        url = self.question.get_absolute_url()
+        etag = self.client.get(url)['ETag']
+
+        ChoiceFactory(question=self.question, choice_text='Never')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Never')
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_api_detail_is_not_modified_until_its_author_changes(self):
+        url = '/api/v1/polls/{}/'.format(self.question.pk)
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+        self.user.profile.bio = 'Traveller'
+        self.user.profile.save()
+        response = self.client.get(url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.json()['created_by']['profile']['bio'], 'Traveller')
+
+    def test_browsable_api_has_no_etag(self):
+        response = self.client.get('/api/v1/polls/{}/'.format(self.question.pk), HTTP_ACCEPT='text/html')
+        self.assertFalse(response.has_header('ETag'))
+
+
 class QuestionCreateTests(TestCase):
     def setUp(self):
         self.user = get_user_model().objects.create_user(
@@ -205,3 +265,295 @@ class QuestionDeleteTests(TestCase):
     def test_question_delete_resolve_questiondeleteview(self):
         view = resolve(self.question.get_delete_url())
         self.assertEqual(view.func.__name__, QuestionDelete.as_view().__name__)
+
+
+class VoteTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@email.com',
+            password='testpass123'
+        )
+        self.question = Question.objects.create(
+            question_text='When will I go to India?',
+            pub_date=timezone.now(),
+            created_by=self.user
+        )
+        self.choice_1 = ChoiceFactory(question=self.question, votes=0)
+        self.choice_2 = ChoiceFactory(question=self.question, votes=3)
+
+    def test_vote_view_lists_choices(self):
+        response = self.client.get(self.question.get_vote_url())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'polls/vote.html')
+        self.assertContains(response, self.question.question_text)
+        self.assertContains(response, self.choice_1.choice_text)
+        self.assertContains(response, self.choice_2.choice_text)
+
+    def test_vote_view_resolve_voteview(self):
+        view = resolve(self.question.get_vote_url())
+        self.assertEqual(view.func.__name__, VoteView.as_view().__name__)
+
+    def test_vote_increments_choice_and_redirects_to_results(self):
+        response = self.client.post(self.question.get_vote_url(), data={'choice': self.choice_1.id})
+
+        self.assertRedirects(response, self.question.get_results_url())
+        self.choice_1.refresh_from_db()
+        self.choice_2.refresh_from_db()
+        self.assertEqual(self.choice_1.votes, 1)
+        self.assertEqual(self.choice_2.votes, 3)
+
+        messages = list(get_messages(response.wsgi_request))
+        self.assertEqual(str(messages[0]), 'Thanks for voting!')
+
+    def test_vote_returns_updated_tallies_as_json(self):
+        response = self.client.post(self.question.get_vote_url(), data={'choice': self.choice_2.id},
+                                    HTTP_ACCEPT='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['total'], 4)
+        self.assertIn({'id': str(self.choice_2.id), 'votes': 4}, data['choices'])
+
+    def test_vote_runs_a_fixed_number_of_queries(self):
+        self.client.force_login(self.user)
+        # session, user, choice, savepoint, ledger insert, increment, release, tallies
+        with self.assertNumQueries(8):
+            self.client.post(self.question.get_vote_url(), data={'choice': self.choice_1.id},
+                             HTTP_ACCEPT='application/json')
+
+    def test_second_vote_is_rejected(self):
+        self.client.post(self.question.get_vote_url(), data={'choice': self.choice_1.id})
+        response = self.client.post(self.question.get_vote_url(), data={'choice': self.choice_2.id})
+        json_response = self.client.post(self.question.get_vote_url(), data={'choice': self.choice_2.id},
+                                         HTTP_ACCEPT='application/json')
+
+        self.assertRedirects(response, self.question.get_results_url())
+        self.assertEqual(json_response.status_code, 409)
+        self.choice_2.refresh_from_db()
+        self.assertEqual(self.choice_2.votes, 3)
+        messages = [str(message) for message in get_messages(response.wsgi_request)]
+        self.assertIn('You have already voted on this question.', messages)
+
+    def test_vote_for_choice_of_another_question_returns_404(self):
+        other_choice = ChoiceFactory(votes=0)
+        response = self.client.post(self.question.get_vote_url(), data={'choice': other_choice.id})
+
+        self.assertEqual(response.status_code, 404)
+        other_choice.refresh_from_db()
+        self.assertEqual(other_choice.votes, 0)
+
+    def test_buffered_votes_on_any_spelling_of_the_choice_id_are_counted(self):
+        buffer = VoteBuffer(flush_interval=0)
+        with mock.patch('polls.models.get_vote_buffer', return_value=buffer), \
+                mock.patch('polls.views.get_vote_buffer', return_value=buffer):
+            self.client.post(self.question.get_vote_url(), data={'choice': str(self.choice_1.id)})
+            self.client.logout()
+            response = self.client.post(self.question.get_vote_url(), data={'choice': str(self.choice_1.id).upper()},
+                                        HTTP_ACCEPT='application/json')
+
+        self.assertIn({'id': str(self.choice_1.id), 'votes': 2}, response.json()['choices'])
+        self.assertEqual(buffer.flush(), 2)
+        self.choice_1.refresh_from_db()
+        self.assertEqual(self.choice_1.votes, 2)
+
+    def test_vote_with_invalid_choice_returns_404(self):
+        response = self.client.post(self.question.get_vote_url(), data={'choice': 'not-a-uuid'})
+        no_choice = self.client.post(self.question.get_vote_url())
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(no_choice.status_code, 404)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@email.com',
+            password='testpass123'
+        )
+        self.staff = get_user_model().objects.create_user(
+            username='staffuser',
+            email='staffuser@email.com',
+            password='testpass123',
+            is_staff=True
+        )
+
+    def test_metrics_are_only_visible_to_staff(self):
+        anonymous_response = self.client.get(reverse('polls:metrics'))
+        self.client.force_login(self.user)
+        user_response = self.client.get(reverse('polls:metrics'))
+
+        self.assertEqual(anonymous_response.status_code, 302)
+        self.assertEqual(user_response.status_code, 403)
+
+    @override_settings(POLLS_VOTE_BUFFER_ENABLED=False)
+    def test_metrics_work_for_staff(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('polls:metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('vote_buffer', response.json())
+
+
+class ResultsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@email.com',
+            password='testpass123'
+        )
+        self.question = Question.objects.create(
+            question_text='When will I go to India?',
+            pub_date=timezone.now(),
+            created_by=self.user
+        )
+        self.choice = ChoiceFactory(question=self.question, votes=7)
+
+    def test_results_view_shows_the_tallies(self):
+        response = self.client.get(self.question.get_results_url())
+        no_response = self.client.get('/polls/123456/results/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'polls/results.html')
+        self.assertContains(response, self.question.question_text)
+        self.assertContains(response, self.choice.choice_text)
+        self.assertContains(response, '7 votes')
+        self.assertEqual(no_response.status_code, 404)
+
+    def test_results_view_for_missing_question_returns_404(self):
+        response = self.client.get(reverse('polls:results', args=[uuid.uuid4()]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_results_api(self):
+        response = self.client.get('/api/v1/polls/{}/results/'.format(self.question.id))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], 7)
+
+
+@override_settings(POLLS_API_MAX_PAGE_SIZE=500)
+class QuestionAPIQueryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@email.com',
+            password='testpass123'
+        )
+
+    def create_questions(self, count):
+        questions = Question.objects.bulk_create([
+            Question(question_text='Question {}'.format(i), slug='question-{}'.format(i), created_by=self.user)
+            for i in range(count)
+        ])
+        Choice.objects.bulk_create([
+            Choice(question=question, choice_text='Choice {}'.format(i))
+            for question in questions for i in range(3)
+        ])
+        return questions
+
+    def test_question_list_api_query_count_does_not_grow_with_questions(self):
+        for count in (1, 10, 500):
+            with self.subTest(count=count):
+                Question.objects.all().delete()
+                self.create_questions(count)
+
+                # One query for the questions and one for all of their choices.
+                with self.assertNumQueries(2):
+                    response = self.client.get('/api/v1/polls/', {'page_size': count})
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), count)
+                self.assertEqual(len(response.json()['results'][0]['choices']), 3)
+
+    def test_question_detail_api_query_count(self):
+        question = self.create_questions(1)[0]
+
+        # The validators, the question joined with its author and profile,
+        # then its choices.
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/polls/{}/'.format(question.id))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created_by']['email'], self.user.email)
+        self.assertEqual(len(response.json()['choices']), 3)
+
+
+class QuestionListValuesTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='testuser', email='testuser@email.com')
+        now = timezone.now()
+        for n in range(5):
+            question = Question.objects.create(
+                question_text='Question ñ "{}"'.format(n), pub_date=now - timezone.timedelta(hours=n), created_by=user)
+            for i in range(n):
+                Choice.objects.create(question=question, choice_text='Choice {}'.format(i))
+
+    def serialize(self, questions):
+        return JSONRenderer().render(QuestionListSerializer(questions.prefetch_related('choices'), many=True).data)
+
+    def test_values_match_the_serializer(self):
+        questions = Question.objects.order_by('-pub_date', '-id')
+        values = QuestionListValues()
+
+        for time_zone in ('UTC', 'America/Argentina/Buenos_Aires'):
+            with self.subTest(time_zone=time_zone), override_settings(TIME_ZONE=time_zone):
+                data = values.to_representation(values.get_queryset(questions))
+                self.assertEqual(JSONRenderer().render(data), self.serialize(questions))
+
+    def test_api_list_matches_the_serializer(self):
+        response = self.client.get('/api/v1/polls/', {'page_size': 3})
+        following = self.client.get(response.json()['next'])
+
+        questions = Question.objects.order_by('-pub_date', '-id')
+        self.assertEqual(JSONRenderer().render(response.data['results']), self.serialize(questions[:3]))
+        self.assertEqual(JSONRenderer().render(following.data['results']), self.serialize(questions[3:]))
+
+
+class QuestionSearchAPITests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@email.com',
+            password='testpass123'
+        )
+        self.india = Question.objects.create(question_text='When will I go to India?', created_by=self.user)
+        self.food = Question.objects.create(question_text='What should we eat tonight?', created_by=self.user)
+        ChoiceFactory(question=self.food, choice_text='Pizza')
+        ChoiceFactory(question=self.food, choice_text='Curry')
+        self.food.tags.add('food')
+
+    def search(self, **params):
+        response = self.client.get('/api/v1/polls/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [question['id'] for question in response.json()['results']]
+
+    def test_search_matches_question_text(self):
+        self.assertEqual(self.search(q='India'), [str(self.india.id)])
+
+    def test_search_matches_choice_text(self):
+        self.assertEqual(self.search(q='pizza'), [str(self.food.id)])
+
+    def test_search_filters_by_tags(self):
+        ChoiceFactory(question=self.india, choice_text='Pizza')
+
+        self.assertEqual(len(self.search(q='pizza')), 2)
+        self.assertEqual(self.search(q='pizza', tags='food'), [str(self.food.id)])
+        self.assertEqual(self.search(q='pizza', tags='travel'), [])
+
+    def test_search_tags_ignore_case(self):
+        ChoiceFactory(question=self.india, choice_text='Pizza')
+        self.india.tags.add('Travel')
+
+        self.assertEqual(self.search(q='pizza', tags='Food'), [str(self.food.id)])
+        self.assertEqual(self.search(q='pizza', tags='TRAVEL,nothing'), [str(self.india.id)])
+
+    @skipIf(connection.vendor != 'postgresql', 'Ranking needs PostgreSQL full-text search')
+    def test_search_ranks_question_text_above_choices(self):
+        curry = Question.objects.create(question_text='Is curry too spicy?', created_by=self.user)
+
+        self.assertEqual(self.search(q='curry'), [str(curry.id), str(self.food.id)])
+
+    def test_search_without_a_query_returns_nothing(self):
+        self.assertEqual(self.search(), [])
@@ -1,19 +1,29 @@
 import logging
 
+from api.views import ValuesListMixin
 from django.contrib import messages
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.messages.views import SuccessMessageMixin
-from django.http import Http404
-from django.shortcuts import get_object_or_404
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.utils import timezone
-from django.views.generic import DetailView, ListView, TemplateView
+from django.utils.decorators import method_decorator
+from django.views.generic import DetailView, ListView, TemplateView, View
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from rest_framework import generics
+from rest_framework.response import Response
 
-from polls.models import Question
+from pages.conditional import conditional, make_etag, page_validators
+from polls.buffer import get_vote_buffer
+from polls.models import AlreadyVoted, Choice, Question, UUIDTaggedItem
+from polls.pagination import QuestionCursorPagination, QuestionSearchPagination
 from polls.permissions import IsAuthorOrReadOnly
-from polls.serializers import QuestionDetailSerializer, QuestionListSerializer
+from polls.results import get_results, invalidate_results, stats, update_results
+from polls.serializers import (QuestionDetailSerializer, QuestionListSerializer,
+                               QuestionListValues)
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +34,15 @@ class QuestionListView(ListView):
     template_name = 'polls/question_list.html'
 
 
+def question_page_validators(request, pk):
+    # Choice changes touch updated_at too, see polls.signals.
+    updated_at = Question.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None, None
+    return page_validators(request, updated_at, last_modified=updated_at)
+
+
+@method_decorator(conditional(question_page_validators), name='get')
 class QuestionDetailView(DetailView):
     model = Question
     context_object_name = 'question'
@@ -72,21 +91,128 @@ class QuestionDelete(LoginRequiredMixin, SuccessMessageMixin, DeleteView):
         return super(QuestionDelete, self).delete(request, *args, **kwargs)
 
 
-class VoteView(TemplateView):
+class VoteView(DetailView):
+    model = Question
+    context_object_name = 'question'
     template_name = 'polls/vote.html'
 
+    def post(self, request, *args, **kwargs):
+        question_id = kwargs['pk']
+        choice_id = request.POST.get('choice')
+        user = request.user if request.user.is_authenticated else None
+        wants_json = 'application/json' in request.META.get('HTTP_ACCEPT', '')
+
+        if user is None and request.session.session_key is None:
+            request.session.save()
+
+        try:
+            tallies = Choice.objects.vote(question_id, choice_id, user=user, session_key=request.session.session_key)
+        except (Choice.DoesNotExist, ValidationError):
+            raise Http404
+        except AlreadyVoted:
+            if wants_json:
+                return JsonResponse({'detail': 'You have already voted on this question.'}, status=409)
+            messages.info(request, 'You have already voted on this question.')
+            return redirect('polls:results', pk=question_id)
+
+        if get_vote_buffer() is None:
+            update_results(question_id, tallies)
+        else:
+            # Buffered tallies only hold this worker's pending votes.
+            invalidate_results(question_id)
+
+        if wants_json:
+            return JsonResponse({
+                'question': question_id,
+                'choices': [{'id': pk, 'votes': votes} for pk, votes in tallies.items()],
+                'total': sum(tallies.values()),
+            })
+
+        messages.success(request, 'Thanks for voting!')
+        return redirect('polls:results', pk=question_id)
+
 
 class ResultsView(TemplateView):
     template_name = 'polls/results.html'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        try:
+            context['results'] = get_results(self.kwargs['pk'])
+        except Question.DoesNotExist:
+            raise Http404
+        return context
 
-class QuestionListAPIView(generics.ListCreateAPIView):
-    queryset = Question.objects.all()
-    serializer_class = QuestionListSerializer
-    permission_classes = (IsAuthorOrReadOnly,)
 
+class MetricsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        buffer = get_vote_buffer()
+        return JsonResponse({
+            'vote_buffer': buffer.stats() if buffer is not None else None,
+            'results_cache': stats.as_dict(),
+        })
 
+
+class QuestionListAPIView(ValuesListMixin, generics.ListCreateAPIView):
+    queryset = Question.objects.prefetch_related('choices')
+    serializer_class = QuestionListSerializer
+    values_serializer_class = QuestionListValues
+    permission_classes = (IsAuthorOrReadOnly,)
+    pagination_class = QuestionCursorPagination
+
+
+def question_api_validators(request, pk):
+    """
+    The author is embedded in the response without a timestamp of its own,
+    so the ETag covers the author's fields and there is no Last-Modified.
+    The browsable API is left alone as it renders forms for the user.
+    """
+    if request.accepted_renderer.format == 'api':
+        return None, None
+    row = Question.objects.filter(pk=pk).values_list(
+        'updated_at', 'created_by_id', 'created_by__email', 'created_by__profile__id', 'created_by__profile__bio',
+        'created_by__profile__location', 'created_by__profile__birth_date').first()
+    if row is None:
+        return None, None
+    return make_etag(request.accepted_media_type, *row), None
+
+
+@method_decorator(conditional(question_api_validators), name='get')
 class QuestionDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Question.objects.all()
+    queryset = Question.objects.select_related('created_by__profile').prefetch_related('choices')
     serializer_class = QuestionDetailSerializer
     permission_classes = (IsAuthorOrReadOnly,)
+
+
+class QuestionSearchAPIView(generics.ListAPIView):
+    serializer_class = QuestionListSerializer
+    permission_classes = (IsAuthorOrReadOnly,)
+    pagination_class = QuestionSearchPagination
+
+    def get_queryset(self):
+        text = self.request.query_params.get('q', '').strip()
+        if not text:
+            return Question.objects.none()
+
+        queryset = Question.objects.search(text).prefetch_related('choices')
+        tags = [tag for tag in self.request.query_params.get('tags', '').split(',') if tag]
+        if tags:
+            # Tag names are case insensitive, see TAGGIT_CASE_INSENSITIVE.
+            matching = Q()
+            for tag in tags:
+                matching |= Q(tag__name__iexact=tag)
+            queryset = queryset.filter(pk__in=UUIDTaggedItem.objects.filter(matching).values('object_id'))
+        return queryset
+
+
+class QuestionResultsAPIView(generics.GenericAPIView):
+    permission_classes = (IsAuthorOrReadOnly,)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return Response(get_results(kwargs['pk']))
+        except Question.DoesNotExist:
+            raise Http404
@@ -0,0 +1,19 @@
+# Generated by Django 3.1 on 2026-10-18 22:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_customuser_manager'),
+    ]
+
+    operations = [
+        # Enrollment imports match emails with LOWER(email) IN (...). Django 3.1
+        # has no expression indexes, the SQL works on PostgreSQL and SQLite.
+        migrations.RunSQL(
+            'CREATE INDEX customuser_email_lower_idx ON users_customuser (LOWER(email))',
+            'DROP INDEX customuser_email_lower_idx',
+        ),
+    ]
@@ -1,16 +1,41 @@
 import uuid
 
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.db import models, transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.urls import reverse
 from django_countries.fields import CountryField
 
 
+class CustomUserManager(UserManager):
+    def bulk_provision(self, users, batch_size=1000):
+        """
+        Insert unsaved users together with their empty profiles, neither of
+        which sends post_save. Returns the users with their primary keys set.
+        """
+        users = list(users)
+        with transaction.atomic():
+            self.bulk_create(users, batch_size=batch_size)
+            if any(user.pk is None for user in users):
+                # Only some databases hand back the ids of bulk inserted rows.
+                ids = dict(self.filter(username__in=[user.username for user in users]).values_list('username', 'pk'))
+                for user in users:
+                    user.pk = ids[user.username]
+            Profile.objects.bulk_create([Profile(user=user) for user in users], batch_size=batch_size)
+        return users
+
+
 class CustomUser(AbstractUser):
-    pass
+    objects = CustomUserManager()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        # The profile is created by a post_save receiver, keep both or neither.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 
 class Profile(models.Model):
@@ -21,9 +46,25 @@ class Profile(models.Model):
     birth_date = models.DateField(null=True, blank=True)
     user = models.OneToOneField(get_user_model(), on_delete=models.CASCADE, related_name='profile')
 
+    tracked_fields = ('bio', 'location', 'country', 'birth_date')
+
     def __str__(self):
         return self.bio
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded = {field: getattr(instance, field) for field in cls.tracked_fields if field in field_names}
+        return instance
+
+    def get_changed_fields(self):
+        loaded = getattr(self, '_loaded', {})
+        return [field for field, value in loaded.items() if getattr(self, field) != value]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded = {field: getattr(self, field) for field in self.tracked_fields}
+
     def get_absolute_url(self):
         return reverse('profile_detail', args=[str(self.id)])
 
@@ -35,5 +76,14 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=get_user_model())
-def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
+def save_user_profile(sender, instance, created, raw=False, **kwargs):
+    """
+    Save a profile edited through its user, e.g. user.profile.bio = ...;
+    user.save(). Saves that never touched the profile, like the last_login
+    update of every login, neither load nor write it.
+    """
+    if created or raw or not sender.profile.is_cached(instance):
+        return
+    changed = instance.profile.get_changed_fields()
+    if changed:
+        instance.profile.save(update_fields=changed)
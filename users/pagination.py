@@ -0,0 +1,16 @@
+from api.pagination import SettingsPageSizeMixin
+from rest_framework.pagination import CursorPagination
+
+
+class UsersCursorPagination(SettingsPageSizeMixin, CursorPagination):
+    """
+    Keyset pagination over a unique key, so no page ever needs an offset or
+    a count of the table.
+    """
+    ordering = 'id'
+    page_size_setting = 'USERS_API_PAGE_SIZE'
+    max_page_size_setting = 'USERS_API_MAX_PAGE_SIZE'
+
+
+class ProfileCursorPagination(UsersCursorPagination):
+    ordering = 'user_id'
@@ -1,16 +1,43 @@
 from django.contrib.auth import get_user_model
+from api.serializers import ValuesSerializer
 from rest_framework import serializers
 
 from users.models import Profile
 
 
-class ProfileSerializer(serializers.HyperlinkedModelSerializer):
+def requested_fields(request):
+    """
+    The set of field names asked for with ?fields=id,email, or None.
+    """
+    if request is None or 'fields' not in request.query_params:
+        return None
+    return {name.strip() for name in request.query_params['fields'].split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Drop the fields a client did not ask for with ?fields=.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get('request'))
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class ProfileSerializer(SparseFieldsMixin, serializers.HyperlinkedModelSerializer):
     class Meta:
         model = Profile
         fields = ('id', 'bio', 'location', 'birth_date',)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class ProfileValues(ValuesSerializer):
+    serializer_class = ProfileSerializer
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     profile = ProfileSerializer(read_only=True)
 
     class Meta:
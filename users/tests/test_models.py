@@ -1,7 +1,13 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from users.models import Profile
+
 
 class CustomUserTests(TestCase):
     def test_create_user(self):
@@ -54,3 +60,57 @@ class SignupTests(TestCase):
         self.assertEqual(get_user_model().objects.all().count(), 1)
         self.assertEqual(get_user_model().objects.all()[0].username, 'newuser')
         self.assertEqual(get_user_model().objects.all()[0].email, 'newuser@email.com')
+
+
+class ProfileSaveTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='luke', email='luke@email.com', password='testpass123')
+
+    def test_login_does_not_touch_the_profile(self):
+        data = {'login': 'luke@email.com', 'password': 'testpass123'}
+
+        # Site, email address, user, verified email, session and last_login,
+        # with the session and last_login writes in savepoints.
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertNumQueries(12):
+                response = self.client.post(reverse('account_login'), data)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse([query for query in queries if 'users_profile' in query['sql']])
+
+    def test_saving_a_user_does_not_load_or_save_the_profile(self):
+        user = get_user_model().objects.get(pk=self.user.pk)
+        user.first_name = 'Luke'
+        with self.assertNumQueries(1):
+            user.save()
+
+    def test_only_changed_profile_fields_are_saved_with_the_user(self):
+        user = get_user_model().objects.get(pk=self.user.pk)
+        user.profile.location = 'Tatooine'
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+
+        self.assertEqual(len(queries), 2)
+        self.assertIn('"location"', queries[1]['sql'])
+        self.assertNotIn('"bio"', queries[1]['sql'])
+        self.assertEqual(Profile.objects.get(user=self.user).location, 'Tatooine')
+
+        with self.assertNumQueries(1):
+            user.save()
+
+    def test_user_is_not_created_without_its_profile(self):
+        with mock.patch.object(Profile.objects, 'create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                get_user_model().objects.create_user(username='leia', email='leia@email.com')
+
+        self.assertFalse(get_user_model().objects.filter(username='leia').exists())
+
+    def test_bulk_provision_creates_users_with_profiles(self):
+        User = get_user_model()
+        users = User.objects.bulk_provision(
+            User(username='user{}'.format(n), email='user{}@email.com'.format(n)) for n in range(50))
+
+        self.assertTrue(all(user.pk for user in users))
+        self.assertEqual(Profile.objects.filter(user__in=users).count(), 50)
+        self.assertEqual(User.objects.get(username='user7').profile.user_id, users[7].pk)
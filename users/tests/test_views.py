@@ -1,3 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
 
-# Create your tests here.
+from users.models import Profile
+from users.serializers import ProfileSerializer
+
+
+class UsersAPIQueryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='luke', email='luke@email.com')
+        self.client.force_login(self.user)
+
+    def provision(self, count):
+        User = get_user_model()
+        offset = User.objects.count()
+        User.objects.bulk_provision(
+            User(username='user{}'.format(offset + n), email='user{}@email.com'.format(offset + n))
+            for n in range(count))
+
+    def test_user_list_runs_the_same_queries_for_10_and_10000_users(self):
+        self.provision(10)
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get('/api/v1/users/')
+        self.assertEqual(len(response.json()['results']), 11)
+
+        self.provision(9990)
+        # Session, user and one page of users joined with their profiles.
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/users/')
+        self.assertEqual(len(small), 3)
+
+        body = response.json()
+        self.assertEqual(len(body['results']), 20)
+        self.assertEqual(body['results'][1]['profile']['bio'], '')
+        self.assertIsNotNone(body['next'])
+
+    def test_user_list_pages_with_a_cursor(self):
+        self.provision(30)
+        first = self.client.get('/api/v1/users/', {'page_size': 25}).json()
+        second = self.client.get(first['next']).json()
+
+        ids = [user['id'] for user in first['results'] + second['results']]
+        self.assertEqual(ids, sorted(get_user_model().objects.values_list('pk', flat=True)))
+        self.assertIsNone(second['next'])
+
+    def test_sparse_fields_skip_the_profile(self):
+        self.provision(10)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/users/', {'fields': 'id,email'})
+
+        self.assertEqual(response.json()['results'][0], {'id': self.user.pk, 'email': 'luke@email.com'})
+        self.assertFalse([query for query in queries if 'users_profile' in query['sql']])
+
+    def test_user_detail_joins_the_profile(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/users/{}/'.format(self.user.pk))
+        self.assertEqual(response.json()['profile']['id'], str(self.user.profile.pk))
+
+    def test_profile_list_runs_the_same_queries_for_10_and_10000_users(self):
+        self.provision(10)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get('/api/v1/profile/')
+
+        self.provision(9990)
+        with self.assertNumQueries(len(small)):
+            response = self.client.get('/api/v1/profile/', {'fields': 'id'})
+
+        self.assertEqual(response.json()['results'][0], {'id': str(Profile.objects.get(user=self.user).pk)})
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_profile_list_matches_the_serializer(self):
+        self.provision(3)
+        profiles = Profile.objects.order_by('user_id')
+        profiles.filter(pk=self.user.profile.pk).update(bio='Jedi "knight"', location='Tatooine', birth_date='1977-05-25')
+
+        for fields in (None, 'birth_date,id'):
+            with self.subTest(fields=fields):
+                query = {'fields': fields} if fields else {}
+                response = self.client.get('/api/v1/profile/', query)
+
+                request = Request(APIRequestFactory().get('/api/v1/profile/', query))
+                expected = ProfileSerializer(profiles, many=True, context={'request': request}).data
+                self.assertEqual(JSONRenderer().render(response.data['results']), JSONRenderer().render(expected))
@@ -1,3 +1,4 @@
+from api.views import ValuesListMixin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
@@ -5,8 +6,10 @@ from django.views.generic import CreateView, DetailView, UpdateView
 from rest_framework import generics
 
 from users.models import Profile
+from users.pagination import ProfileCursorPagination, UsersCursorPagination
 from users.permissions import IsAuthorOrReadOnly, IsProfileAuthorOrReadOnly
-from users.serializers import ProfileSerializer, UserSerializer
+from users.serializers import (ProfileSerializer, ProfileValues,
+                               UserSerializer, requested_fields)
 
 
 class ProfileDetailView(LoginRequiredMixin, DetailView):
@@ -33,22 +36,33 @@ class ProfileUpdate(LoginRequiredMixin, SuccessMessageMixin, UpdateView):
     success_message = 'Profile updated successfully!'
 
 
-class UserListAPIView(generics.ListCreateAPIView):
-    queryset = get_user_model().objects.all()
+class UserQuerysetMixin:
+    def get_queryset(self):
+        queryset = get_user_model().objects.all()
+        fields = requested_fields(self.request)
+        # Join the profile in unless the client left it out with ?fields=.
+        if fields is None or 'profile' in fields:
+            queryset = queryset.select_related('profile')
+        return queryset
+
+
+class UserListAPIView(UserQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = UserSerializer
     permissions_classes = (IsAuthorOrReadOnly,)
+    pagination_class = UsersCursorPagination
 
 
-class UserDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = get_user_model().objects.all()
+class UserDetailAPIView(UserQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = UserSerializer
     permissions_classes = (IsAuthorOrReadOnly,)
 
 
-class ProfileListAPIView(generics.ListAPIView):
+class ProfileListAPIView(ValuesListMixin, generics.ListAPIView):
     queryset = Profile.objects.all()
     serializer_class = ProfileSerializer
+    values_serializer_class = ProfileValues
     permission_classes = (IsProfileAuthorOrReadOnly,)
+    pagination_class = ProfileCursorPagination
 
 
 class ProfileDetailAPIView(generics.RetrieveUpdateDestroyAPIView):